@@ -1,51 +1,161 @@
+import sys
 import substitution
 import detachment
 import chaining
+import memory
+import proof_cache
+import instrumentation
+import limits
+import portfolio
+import tautology
 from theorems import axioms
+from expression import Expression
 
 
-def executive_routine(expression):
-    sub = substitution.method_of_substitution(expression)
-    if sub:
-        print("Expression has been proved using the method of substitution.\n")
-        axioms.update({(len(axioms) + 1): sub})
+# The proof methods, in the order they are attempted by the executive routine.
+METHODS = [
+    ("substitution", substitution.substitution_proof),
+    ("detachment", detachment.detachment_proof),
+    ("chaining", chaining.chaining_proof),
+]
 
+
+def attempt_methods(expression, time_limit=None, max_steps=None):
+    """Attempts the expression with each method in turn, within a single budget shared between the methods, until one
+    proves it. Returns a dictionary of the method which proved the expression, the proof and the keys of the theorems
+    used, with "exhausted" recording the method the budget ran out in, if it did."""
+    outcome = {"method": None, "proof": None, "theorems": None, "exhausted": None}
+    budget = limits.Budget(time_limit, max_steps)
+    for method, proof_method in METHODS:
+        started = instrumentation.start()
+        try:
+            proof, keys = proof_method(expression, budget=budget)
+        except limits.BudgetExhausted as exhausted:
+            instrumentation.attempt(method, False, started)
+            instrumentation.count(method, "exhausted")
+            outcome["exhausted"] = method
+            if instrumentation.tracing:
+                instrumentation.event("executive.exhausted", expression=expression, method=method,
+                                      reason=str(exhausted), steps=budget.steps)
+            return outcome
+
+        instrumentation.attempt(method, proof, started)
+        if proof:
+            outcome.update(method=method, proof=proof, theorems=keys)
+            break
+
+    return outcome
+
+
+def executive_routine(expression, store=True, time_limit=None, max_steps=None, race=False, prefilter=True):
+    """Attempts to prove the expression using the methods of substitution, detachment and chaining in turn. Any
+    expression proved is added to the theorem memory, with its method and the theorems it used recorded in the proof
+    DAG (see memory.derivations), unless store is False. Returns a dictionary recording the method
+    which proved the expression, the proof, the keys of the theorems used and the key the proof was stored under.
+
+    The keys of the theorems used are recorded in the theorem memory, which keeps the most useful theorems if it is
+    bounded (see memory.set_capacity).
+
+    The proof cache is checked before any method is attempted, so an expression (or one differing only by the names of its variables) which
+    has already been attempted is not attempted again.
+
+    The attempt can be limited to a wall time in seconds and a number of steps, shared between the methods (see
+    limits.Budget). If the budget runs out, the attempt is abandoned, and "exhausted" records the method it ran out in.
+    An exhausted attempt is not a failure to prove the expression, so it is not kept in the proof cache.
+
+    If race is True, the methods are attempted at once in separate processes instead, and the first proof found is
+    used (see portfolio.race).
+
+    Unless prefilter is False, an expression which is not a tautology is rejected before any method is attempted, as
+    it cannot be a theorem. "counterexample" then records an assignment of its variables under which it is false."""
+    result = {"method": None, "proof": None, "theorems": None, "stored": None, "cached": False, "exhausted": None,
+              "counterexample": None}
+
+    # The prefilter is applied before the proof cache, so a proof cached without it is never returned for an
+    # expression which is not a tautology.
+    if prefilter:
+        result["counterexample"] = tautology.counterexample(expression)
+        if result["counterexample"] is not None:
+            instrumentation.count("executive", "refuted")
+            if instrumentation.tracing:
+                instrumentation.event("executive.refuted", expression=expression,
+                                      counterexample=result["counterexample"])
+            return result
+
+    cached = proof_cache.lookup(expression)
+    if cached is not None:
+        result.update(cached, cached=True)
+        instrumentation.count("executive", "cache_hits")
+        if instrumentation.tracing:
+            instrumentation.event("executive.cached", expression=expression, method=result["method"],
+                                  proof=result["proof"])
+        if result["proof"] is not None:
+            memory.record_use(result["theorems"])
+            if store:
+                result["stored"] = memory.add_theorem(result["proof"], result["method"], result["theorems"])
+        return result
+
+    outcome = (portfolio.race if race else attempt_methods)(expression, time_limit, max_steps)
+    if outcome["exhausted"] is not None:
+        result["exhausted"] = outcome["exhausted"]
+        return result
+
+    result.update(method=outcome["method"], proof=outcome["proof"], theorems=outcome["theorems"])
+    proof_cache.record(expression, result)
+    if result["proof"]:
+        memory.record_use(result["theorems"])
+        if store:
+            result["stored"] = memory.add_theorem(result["proof"], result["method"], result["theorems"])
+
+    if instrumentation.tracing:
+        instrumentation.event("executive.result", expression=expression, method=result["method"],
+                              proof=result["proof"], theorems=result["theorems"], stored=result["stored"])
+    return result
+
+
+def report(result):
+    """Reports the result of the executive routine at the terminal."""
+    if result["exhausted"] is not None:
+        print(f"\nThe time or step limit was reached during the method of {result['exhausted']}.\n")
+    elif result["counterexample"] is not None:
+        assignment = ", ".join(f"{name}={'T' if value else 'F'}" for name, value in result["counterexample"].items())
+        print(f"\nExpression is not a tautology, so it cannot be a theorem. It is false when {assignment}.\n")
+    elif result["proof"] is None:
+        print("\nExpression could not be proved using the methods of LT.\n")
     else:
-        print("Expression could not be proved using the method of substitution.\n")
-        print("LT will now attempt to prove the expression using the method of detachment.")
+        source = " (from the proof cache)" if result["cached"] else ""
+        print(f"\nExpression has been proved using the method of {result['method']}{source}.")
+        print(f"Proof: {result['proof']}\n")
+
 
-        detach = detachment.method_of_detachment(expression)
-        if detach:
-            print("Expression has been proved using the method of detachment.\n")
-            axioms.update({(len(axioms) + 1): detach})
+def main():
+    """Interactive loop, proving one expression entered at the terminal at a time. The path of a persistent theorem
+    store can be given as an argument, in which case the theorem memory is loaded from and saved to it."""
+    if len(sys.argv) > 1:
+        memory.attach(sys.argv[1])
 
+    # Each step of the proof methods is reported at the terminal as it happens.
+    instrumentation.add_sink(instrumentation.console_sink)
+
+    loop = True
+    while loop:
+        expression_input = input("\nPlease enter an expression to be proved.\n"
+                                 "Enter the central connective as ':>:'. \n"
+                                 "Units can be defined by using '.>.' or '.v.' connectives.\n"
+                                 "To close the program, enter 'quit'.\n"
+                                 "To see the list of theorems, enter 'theorems'.\n"
+                                 "> ")
+
+        exp_list = Expression(expression_input.split(" "))
+        if expression_input == "quit":
+            loop = False
+        elif expression_input == "theorems":
+            memory.update_indexes()
+            for i in axioms:
+                print(f"{i}: {axioms[i]}")
         else:
-            print("Expression could not be proved using the method of detachment.\n")
-            print("LT will now attempt to prove the expression using the method of chaining.")
-
-            chain = chaining.method_of_chaining(expression)
-            if chain:
-                print("Expression has been proved using the method of chaining.\n")
-                axioms.update({(len(axioms) + 1): chain})
-
-            else:
-                print("\nExpression could not be proved using the methods of LT.\n")
-
-
-loop = True
-while loop:
-    expression_input = input("\nPlease enter an expression to be proved.\n"
-                             "Enter the central connective as ':>:'. \n"
-                             "Units can be defined by using '.>.' or '.v.' connectives.\n"
-                             "To close the program, enter 'quit'.\n"
-                             "To see the list of theorems, enter 'theorems'.\n"
-                             "> ")
-
-    exp_list = expression_input.split(" ")
-    if expression_input == "quit":
-        loop = False
-    elif expression_input == "theorems":
-        for i in axioms:
-            print(f"{i}: {axioms[i]}")
-    else:
-        executive_routine(exp_list)
+            report(executive_routine(exp_list))
+
+
+if __name__ == "__main__":
+    main()
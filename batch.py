@@ -0,0 +1,152 @@
+import argparse
+import contextlib
+import json
+import sys
+import time
+
+import LT
+import memory
+import portfolio
+import shards
+import instrumentation
+from expression import Expression
+
+
+def parse_line(line):
+    """Reads one line of batch input. A line is either an expression written as it would be entered at the terminal
+    (i.e. 'p v p :>: p'), or a JSON object with an "expression" field (and optionally an "id" field) holding the
+    expression as a string or as a list of tokens. Returns the id (or None) and the expression, or None for a blank
+    line."""
+    line = line.strip()
+    if not line:
+        return None
+
+    if line.startswith("{"):
+        return parse_record(json.loads(line))
+
+    return None, Expression(line.split())
+
+
+def parse_record(record):
+    """Reads the id (or None) and the expression from a JSON object with an "expression" field, holding the expression
+    as a string or as a list of tokens."""
+    expression = record["expression"]
+    if isinstance(expression, str):
+        expression = expression.split()
+    return record.get("id"), Expression(expression)
+
+
+def read_expressions(stream):
+    """Streams (id, expression) pairs from an input stream, one line at a time. Lines without an id are numbered by
+    their line in the input. A line which cannot be read, such as malformed JSON or a record without an "expression"
+    field, is numbered by its line and given a ValueError in place of its expression, which prove reports, so one bad
+    line does not end the batch."""
+    for number, line in enumerate(stream, start=1):
+        try:
+            parsed = parse_line(line)
+        except (ValueError, KeyError, TypeError) as error:
+            yield number, ValueError(f"Line {number} could not be read: {type(error).__name__}: {error}")
+            continue
+        if parsed is None:
+            continue
+        key, expression = parsed
+        if key is None:
+            key = number
+        yield key, expression
+
+
+def prove(key, expression, store=True, time_limit=None, max_steps=None, race=False):
+    """Runs the executive routine on a single expression, within the given time and step limits, and returns the
+    result as a dictionary which can be written as JSON. The expression of a line which could not be read is the error
+    raised reading it (see read_expressions), which is reported as the error of the result."""
+    unreadable = isinstance(expression, Exception)
+    record = {"id": key, "expression": None if unreadable else str(expression)}
+    start = time.perf_counter()
+    try:
+        if unreadable:
+            raise expression
+        result = LT.executive_routine(expression, store=store, time_limit=time_limit, max_steps=max_steps, race=race)
+    except Exception as error:
+        record.update(proved=False, method=None, proof=None, theorems=None, stored=None, cached=False, exhausted=None,
+                      counterexample=None, error=f"{type(error).__name__}: {error}")
+    else:
+        record.update(proved=result["proof"] is not None, method=result["method"],
+                      proof=str(result["proof"]) if result["proof"] is not None else None,
+                      theorems=result["theorems"], stored=result["stored"], cached=result["cached"],
+                      exhausted=result["exhausted"], counterexample=result["counterexample"])
+    record["time"] = time.perf_counter() - start
+    return record
+
+
+def prove_stream(expressions, store=True, time_limit=None, max_steps=None, race=False):
+    """Proves each (id, expression) pair in turn, yielding each result as soon as it is available."""
+    for key, expression in expressions:
+        yield prove(key, expression, store=store, time_limit=time_limit, max_steps=max_steps, race=race)
+
+
+def write_results(results, stream):
+    """Writes each result to the output stream as a line of JSON, flushing after each line."""
+    for record in results:
+        stream.write(json.dumps(record) + "\n")
+        stream.flush()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Prove a batch of expressions, one per line or one JSON object per "
+                                                 "line, writing one JSON result per line.")
+    parser.add_argument("input", nargs="?", default="-", help="input file, or '-' for stdin (default)")
+    parser.add_argument("-o", "--output", default="-", help="output file, or '-' for stdout (default)")
+    parser.add_argument("--no-store", action="store_true",
+                        help="do not add proved expressions to the theorem memory")
+    parser.add_argument("--theorem-store", help="persistent theorem store to load and save the theorem memory to")
+    parser.add_argument("--capacity", type=int, default=None,
+                        help="largest number of theorems kept in the theorem memory, evicting the least used")
+    parser.add_argument("--library", help="library of derived theorems written by saturate.py, to load at start up")
+    parser.add_argument("--shards", type=int, default=0,
+                        help="number of processes to hold the discrimination trees of the theorem memory")
+    parser.add_argument("--time-limit", type=float, default=None, help="seconds allowed to prove each expression")
+    parser.add_argument("--max-steps", type=int, default=None, help="steps allowed to prove each expression")
+    parser.add_argument("--portfolio", action="store_true",
+                        help="race the methods in separate processes, taking the first proof found")
+    parser.add_argument("--metrics", action="store_true",
+                        help="write per-method and theorem memory metrics (and the methods' wins, with --portfolio) to "
+                             "stderr when finished")
+    parser.add_argument("--trace", help="file to write a trace event to for each proof step, as JSON lines")
+    args = parser.parse_args(argv)
+    if args.shards and args.portfolio:
+        # The racing processes are forked, and could not share the parent's pipes to the shards.
+        parser.error("--shards cannot be used with --portfolio")
+
+    if args.theorem_store:
+        memory.attach(args.theorem_store)
+    if args.library:
+        memory.load_library(args.library)
+    memory.set_capacity(args.capacity)
+    if args.shards:
+        memory.attach_shards(shards.ShardRouter(args.shards))
+    if args.metrics:
+        instrumentation.enable()
+
+    with contextlib.ExitStack() as stack:
+        if args.trace:
+            instrumentation.add_sink(instrumentation.json_sink(stack.enter_context(open(args.trace, "w"))))
+        source = sys.stdin if args.input == "-" else stack.enter_context(open(args.input))
+        target = sys.stdout if args.output == "-" else stack.enter_context(open(args.output, "w"))
+        results = prove_stream(read_expressions(source), store=not args.no_store, time_limit=args.time_limit,
+                               max_steps=args.max_steps, race=args.portfolio)
+        write_results(results, target)
+
+    if args.metrics:
+        instrumentation.report()
+        sys.stderr.write(json.dumps({"memory": memory.usage_report()}) + "\n")
+        if args.portfolio:
+            sys.stderr.write(json.dumps({"portfolio": portfolio.statistics()}) + "\n")
+        if args.shards:
+            sys.stderr.write(json.dumps({"shards": memory.shard_router.sizes()}) + "\n")
+
+    if memory.shard_router is not None:
+        memory.shard_router.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,268 @@
+import argparse
+import json
+import random
+import time
+import tracemalloc
+
+import LT
+import substitution
+import detachment
+import chaining
+import memory
+import proof_cache
+import syntax
+import unification
+from expression import Expression
+from theorems import axioms
+
+VARIABLES = "abcdefghijklmnopqrstuwxyz"
+STANDARD_CONNECTIVES = ["v", ">"]
+UNIT_CONNECTIVES = [".v.", ".>."]
+
+# The axioms as they were when the benchmark started, restored before each theorem memory size is measured.
+BASE_AXIOMS = dict(axioms)
+
+
+# # RANDOM FORMULAS
+
+
+def random_variable(rng, distinct, negation):
+    """Picks one of the first `distinct` variables, made negative with probability `negation`."""
+    variable = VARIABLES[rng.randrange(distinct)]
+    if rng.random() < negation:
+        return f"-{variable}"
+    return variable
+
+
+def random_formula(rng, levels=4, distinct=3, units=2, negation=0.2):
+    """Generates a well-formed expression in the project's syntax with the given number of levels (NK, the number of
+    variables written), at most `distinct` distinct variables (NJ) and the given number of units. The units are joined
+    by '.v.' or '.>.', apart from one ':>:' chosen as the main connective, and the variables within each unit are joined
+    by 'v' or '>'."""
+    if units < 2 or levels < units:
+        raise ValueError("A formula needs at least two units, and at least one level in each unit.")
+    distinct = min(distinct, len(VARIABLES))
+
+    # Each unit gets one level, and the rest are shared out at random.
+    sizes = [1] * units
+    for _ in range(levels - units):
+        sizes[rng.randrange(units)] += 1
+
+    main = rng.randrange(1, units)
+    formula = []
+    for i, size in enumerate(sizes):
+        if i:
+            formula.append(":>:" if i == main else rng.choice(UNIT_CONNECTIVES))
+        for j in range(size):
+            if j:
+                formula.append(rng.choice(STANDARD_CONNECTIVES))
+            formula.append(random_variable(rng, distinct, negation))
+
+    return Expression(formula)
+
+
+def random_theorem(rng, distinct=3, negation=0.2):
+    """Generates a theorem by substituting a random variable or small unit for each variable of a random axiom, so the
+    theorem memory can be filled with genuine theorems of varied shapes."""
+    keys = sorted(BASE_AXIOMS)
+    while True:
+        tree = syntax.parse(BASE_AXIOMS[rng.choice(keys)])
+        binding = {}
+        for variable in tree.variables:
+            value = [random_variable(rng, distinct, negation)]
+            if rng.random() < 0.5:
+                value += [rng.choice(STANDARD_CONNECTIVES), random_variable(rng, distinct, negation)]
+            binding[variable] = Expression(value)
+        theorem = unification.instantiate(tree, binding)
+        if theorem is not None:
+            return theorem
+
+
+# # MEASUREMENT
+
+
+def reset_memory():
+    """Restores the theorem memory to the axioms it held when the benchmark started, and empties the proof cache."""
+    memory.detach()
+    axioms.clear()
+    axioms.update(BASE_AXIOMS)
+    memory.clear_indexes()
+    memory.update_indexes()
+    proof_cache.clear()
+
+
+def fill_memory(rng, size, distinct):
+    """Adds random theorems to the theorem memory until it holds `size` theorems beyond the axioms. Gives up after
+    `size` rejected duplicates in a row, as the formulas available at this number of distinct variables have run out."""
+    rejected = 0
+    while len(axioms) < len(BASE_AXIOMS) + size and rejected < size:
+        key = memory.last_key
+        stored = memory.add_theorem(random_theorem(rng, distinct))
+        if stored is None or stored <= key:
+            rejected += 1
+        else:
+            rejected = 0
+
+
+def percentile(values, fraction):
+    """Returns the value at the given fraction of the sorted values (nearest rank)."""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def pipeline(expression):
+    """The full executive routine, without storing proofs, so the theorem memory size stays fixed."""
+    return LT.executive_routine(expression, store=False)
+
+
+TARGETS = {
+    "substitution": substitution.method_of_substitution,
+    "detachment": detachment.method_of_detachment,
+    "chaining": chaining.method_of_chaining,
+    "pipeline": pipeline,
+}
+
+
+def attempt(target, expression):
+    """Runs the target on a single query, returning its result and None, or None and the error it raised. The original
+    methods raise IndexError, KeyError or ValueError on some expressions, and any error is returned rather than
+    raised, so one query cannot end the benchmark. An error is not a failure to prove the expression, and is counted
+    separately."""
+    try:
+        return target(expression), None
+    except Exception as error:
+        return None, error
+
+
+def measure(target, queries, cache=True):
+    """Runs the target over each query, returning the latency of each call, the number of expressions proved, and the
+    number of calls which raised an error. The proof cache is emptied before each call unless `cache` is True."""
+    latencies = []
+    proved = 0
+    errors = 0
+    for expression in queries:
+        if not cache:
+            proof_cache.clear()
+        start = time.perf_counter()
+        result, error = attempt(target, expression)
+        latencies.append(time.perf_counter() - start)
+        if error is not None:
+            errors += 1
+            continue
+        if isinstance(result, dict):
+            result = result["proof"]
+        if result:
+            proved += 1
+    return latencies, proved, errors
+
+
+def peak_memory(target, queries, cache=True):
+    """Runs the target over each query with tracemalloc running, returning the peak memory allocated in bytes."""
+    tracemalloc.start()
+    try:
+        measure(target, queries, cache)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def allocations(target, queries, cache=True):
+    """Runs the target over each query with tracemalloc running, returning the mean over the calls of the memory
+    allocated at the peak of each call, beyond what was allocated before it, in bytes. Memory allocated and freed
+    within a call still counts towards its peak, so this measures the temporary copies made while proving an
+    expression as well as what is kept afterwards. Calls which raise an error are measured in the same way; they are
+    counted by measure, over the same queries."""
+    tracemalloc.start()
+    try:
+        total = 0
+        for expression in queries:
+            if not cache:
+                proof_cache.clear()
+            before = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            attempt(target, expression)
+            total += tracemalloc.get_traced_memory()[1] - before
+        return total / len(queries)
+    finally:
+        tracemalloc.stop()
+
+
+def run(queries=200, sizes=(0, 1000), levels=4, distinct=3, units=2, seed=0, targets=tuple(TARGETS), cache=False,
+        memory_peaks=True, allocation_peaks=False):
+    """Runs the benchmark, yielding one report per theorem memory size and target. The same queries are used at every
+    size, so the sizes can be compared."""
+    rng = random.Random(seed)
+    workload = [random_formula(rng, levels, distinct, units) for _ in range(queries)]
+    for size in sizes:
+        # The theorems are drawn from their own generator, so they do not change the queries, nor repeat them.
+        reset_memory()
+        fill_memory(random.Random(seed + 1), size, distinct)
+
+        for name in targets:
+            proof_cache.clear()
+            latencies, proved, errors = measure(TARGETS[name], workload, cache)
+            total = sum(latencies)
+            report = {
+                "target": name, "memory": len(axioms), "queries": queries, "proved": proved, "errors": errors,
+                "throughput": queries / total if total else float("inf"),
+                "p50": percentile(latencies, 0.5), "p90": percentile(latencies, 0.9),
+                "p99": percentile(latencies, 0.99), "max": max(latencies),
+            }
+            if memory_peaks:
+                proof_cache.clear()
+                report["peak_bytes"] = peak_memory(TARGETS[name], workload, cache)
+            if allocation_peaks:
+                proof_cache.clear()
+                report["allocated_bytes"] = allocations(TARGETS[name], workload, cache)
+            yield report
+
+    reset_memory()
+
+
+def format_report(report):
+    """Formats a report as a line of the results table."""
+    line = (f"{report['target']:<13}{report['memory']:>8}{report['proved']:>8}{report['errors']:>8}"
+            f"{report['throughput']:>12.1f}"
+            f"{report['p50'] * 1e3:>10.3f}{report['p90'] * 1e3:>10.3f}{report['p99'] * 1e3:>10.3f}")
+    if "peak_bytes" in report:
+        line += f"{report['peak_bytes'] / 1024:>12.1f}"
+    if "allocated_bytes" in report:
+        line += f"{report['allocated_bytes']:>12.0f}"
+    return line
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time the proof methods over randomly generated formulas, at a "
+                                                 "range of theorem memory sizes.")
+    parser.add_argument("-n", "--queries", type=int, default=200, help="formulas to prove per measurement")
+    parser.add_argument("-m", "--memory", type=int, nargs="+", default=[0, 1000],
+                        help="theorems to add to the memory beyond the axioms, one measurement per size")
+    parser.add_argument("--levels", type=int, default=4, help="levels (NK) of each formula")
+    parser.add_argument("--distinct", type=int, default=3, help="largest number of distinct variables (NJ)")
+    parser.add_argument("--units", type=int, default=2, help="units in each formula")
+    parser.add_argument("--seed", type=int, default=0, help="random seed")
+    parser.add_argument("-t", "--targets", nargs="+", choices=sorted(TARGETS), default=list(TARGETS),
+                        help="methods to time")
+    parser.add_argument("--cache", action="store_true", help="keep the proof cache between queries")
+    parser.add_argument("--no-memory", action="store_true", help="skip the peak memory measurement")
+    parser.add_argument("--allocations", action="store_true",
+                        help="also measure the memory allocated at the peak of each call, averaged over the calls")
+    parser.add_argument("--json", action="store_true", help="write one JSON report per line instead of a table")
+    args = parser.parse_args(argv)
+
+    reports = run(args.queries, args.memory, args.levels, args.distinct, args.units, args.seed, args.targets,
+                  args.cache, not args.no_memory, args.allocations)
+    if not args.json:
+        header = (f"{'target':<13}{'memory':>8}{'proved':>8}{'errors':>8}{'per sec':>12}{'p50 ms':>10}{'p90 ms':>10}"
+                  f"{'p99 ms':>10}")
+        if not args.no_memory:
+            header += f"{'peak KiB':>12}"
+        if args.allocations:
+            header += f"{'alloc B':>12}"
+        print(header)
+    for report in reports:
+        print(json.dumps(report) if args.json else format_report(report), flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+from expression import Expression
+
+CONNECTIVES = ["v", ".v.", ">", ".>.", ":>:"]
+
+
+def canonical_name(n):
+    """Name given to the n-th distinct variable of an expression in its canonical form."""
+    return f"x{n}"
+
+
+def variable_renaming(expression):
+    """Returns the renaming of the variables of the expression to their canonical names, in order of first
+    occurrence. Negative signs are not part of a variable's name, so 'p' and '-p' are renamed together."""
+    renaming = {}
+    for token in expression:
+        if token not in CONNECTIVES:
+            name = token.lstrip("-")
+            if name not in renaming:
+                renaming[name] = canonical_name(len(renaming) + 1)
+    return renaming
+
+
+def rename(expression, renaming):
+    """Renames the variables of the expression using the renaming. Variables not in the renaming are left unchanged."""
+    renamed = []
+    for token in expression:
+        if token in CONNECTIVES:
+            renamed.append(token)
+        else:
+            name = token.lstrip("-")
+            negatives = token[:len(token) - len(name)]
+            renamed.append(negatives + renaming.get(name, name))
+    return Expression(renamed)
+
+
+def alpha_normalise(expression):
+    """Returns the canonical form of the expression, with its variables renamed in order of first occurrence. Two
+    expressions which differ only by the names of their variables have the same canonical form."""
+    return rename(expression, variable_renaming(expression))
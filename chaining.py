@@ -1,80 +1,120 @@
+import heapq
+from array import array
 from theorems import axioms
+from expression import Expression, MAIN_CONNECTIVE, as_expression
 import substitution
-import detachment
+import syntax
+import unification
+import memory
+import instrumentation
+import limits
 
-
-def similarity1(expression):
-    """Search for a theorem (T) with a left side similar to the left side of expression (A)."""
-    matches = []
-    description_a_left = substitution.description_left(expression)
-    for i in axioms:
-        if substitution.description_left(axioms[i]) == description_a_left:
-            matches.append(i)
-
-    return matches
-
-
-def similarity2(b):
-    """Search for a theorem (T) with a left side similar to B"""
-    matches = []
-    description_b = substitution.description(b)
-    for i in axioms:
-        if substitution.description_left(axioms[i]) == description_b:
-            matches.append(i)
-
-    return matches
+# Default limits on the chaining search. The depth is the largest number of theorems chained together, and the nodes
+# are the largest number of intermediate expressions expanded. The frontier is the largest number of expressions
+# waiting to be expanded; the least promising are discarded beyond this. The limits are counts rather than a time, so
+# the search, and whether it fails, is the same on every machine.
+MAX_DEPTH = 3
+MAX_NODES = 1000
+MAX_FRONTIER = 500
 
 
 def construct_proof(a, c):
     """The proof for the expression is constructed using the previously calculated 'a' and 'c' values."""
-    a_implies_c = []
-
-    enumerated_a = substitution.enumerate_expression(a)
-    enumerated_c = substitution.enumerate_expression(c)
-    for i in enumerated_a:
-        a_implies_c.append(enumerated_a[i])
-
-    a_implies_c.append(":>:")
-
-    for i in enumerated_c:
-        a_implies_c.append(enumerated_c[i])
-
-    return a_implies_c
+    # The token ids of A, the main connective and C are joined into a single array, without copying any tokens.
+    a_implies_c = array("I", as_expression(a).ids)
+    a_implies_c.append(MAIN_CONNECTIVE)
+    a_implies_c.extend(as_expression(c).ids)
+
+    return Expression.from_ids(a_implies_c)
+
+
+def distance(b, c):
+    """Estimates how far the expression B is from C by the difference between their descriptions. Used to order the
+    search frontier, so the expressions most similar to C are expanded first."""
+    return sum(abs(x - y) for x, y in zip(substitution.description(b), substitution.description(c)))
+
+
+def chaining_proof(expression, max_depth=MAX_DEPTH, max_nodes=MAX_NODES, max_frontier=MAX_FRONTIER, budget=None):
+    """Forward chaining method. To try to prove A>C, we search for a chain of theorems A>B1, B1>B2, ..., Bn>C. Returns
+    the proof, and the keys of the theorems in the chain.
+
+    The search is best-first: each expression B reached from A is expanded by unifying it with the left side of each
+    theorem retrieved from the theorem memory, and the expressions whose descriptions are closest to C are expanded
+    first. Each expression is only expanded once, and the search stops when the depth or node limit is reached. These
+    limits bound the search itself, so reaching one is a failure to prove the expression. Each theorem tried is also a
+    step of the budget of the query, if one is given, which abandons the search when it runs out. A time limit is only
+    set through the budget, so running out of time is never mistaken for (and cached as) a failure."""
+    if budget is None:
+        budget = limits.Budget()
+    if instrumentation.tracing:
+        instrumentation.event("chaining.start", expression=expression)
+
+    tree = syntax.parse(expression)
+    if tree.op != ":>:":
+        if instrumentation.tracing:
+            instrumentation.event("chaining.no_main_connective", expression=expression)
+        return False, None
+
+    a = tree.left.expression
+    c = tree.right.expression
+    c_tree = syntax.parse(c)
+
+    # Each entry in the frontier is (distance to C, depth, order added, B, keys of the theorems chaining A to B). The
+    # order added breaks ties, so the search is the same on every run.
+    frontier = [(distance(a, c), 0, 0, a, [])]
+    visited = {a}
+    added = 1
+    expanded = 0
+
+    while frontier and expanded < max_nodes:
+        _, depth, _, b, chain = heapq.heappop(frontier)
+        expanded += 1
+
+        candidates = memory.left_unifiable(syntax.parse(b))
+        instrumentation.count("chaining", "candidates", len(candidates))
+        instrumentation.count("chaining", "expanded")
+        for key in candidates:
+            budget.spend()
+            theorem = axioms[key]
+            theorem_tree = syntax.parse(theorem)
+            if theorem_tree.op != ":>:":
+                continue
+
+            binding = unification.match(theorem_tree.left, syntax.parse(b))
+            if binding is None:
+                continue
+
+            # The chain is complete if the right side of the theorem matches C, with the same binding.
+            if unification.match(theorem_tree.right, c_tree, binding) is not None:
+                chain = chain + [key]
+                proof = construct_proof(a, c)
+                if instrumentation.tracing:
+                    instrumentation.event("chaining.proof", chain=chain, theorems=[axioms[step] for step in chain],
+                                          proof=proof)
+                return proof, chain
+
+            if depth + 1 >= max_depth:
+                continue
+
+            following = unification.instantiate(theorem_tree.right, binding)
+            if following is None or following in visited:
+                continue
+
+            visited.add(following)
+            heapq.heappush(frontier, (distance(following, c), depth + 1, added, following, chain + [key]))
+            added += 1
+
+        # The frontier is bounded by discarding the expressions furthest from C.
+        if len(frontier) > max_frontier:
+            frontier = heapq.nsmallest(max_frontier, frontier)
+            heapq.heapify(frontier)
+
+    if instrumentation.tracing:
+        instrumentation.event("chaining.no_chain", expression=expression, expanded=expanded)
+    return False, None
 
 
 def method_of_chaining(expression):
-    """Forward chaining method. To try to prove A>C, we must first prove A>B and B>C."""
-    print(f"A>C: {expression}")
-
-    similar_theorems = similarity1(expression)
-    b = detachment.get_right_subexpression(axioms[similar_theorems[-1]])
-
-    a_b = axioms[similar_theorems[-1]]
-    print(f"A>B: {a_b}")
-
-    c = detachment.get_right_subexpression(expression)
-    description_c = substitution.description(c)
-
-    similar_theorems2 = similarity2(b)
-    similar_theorems3 = []
-    for i in similar_theorems2:
-        if substitution.description_right(axioms[i]) == description_c:
-            similar_theorems3.append(i)
-
-    b_c = axioms[similar_theorems3[0]]
-    print(f"B>C: {b_c}")
-
-    a_b_left = detachment.get_left_subexpression(a_b)
-    b_c_right = detachment.get_right_subexpression(b_c)
-
-    if len(similar_theorems3) > 0:
-
-        proof = construct_proof(a_b_left, b_c_right)
-        print(f"A>C: {proof}")
-
-        if proof == expression:
-            return proof
-        else:
-            return False
-    else:
-        return False
+    """Forward chaining method. To try to prove A>C, we search for a chain of theorems A>B1, B1>B2, ..., Bn>C."""
+    proof = chaining_proof(expression)[0]
+    return proof
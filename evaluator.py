@@ -0,0 +1,141 @@
+from functools import lru_cache, partial
+
+import syntax
+from expression import as_expression
+
+# Connectives read as disjunction. Every other connective is read as implication, so 'p > q' is '-p v q'.
+DISJUNCTIONS = {"v", ".v."}
+
+# Number of compiled programs kept, keyed on shape, and of expressions whose evaluator is kept, keyed on expression.
+PROGRAM_CACHE_SIZE = 4096
+EVALUATOR_CACHE_SIZE = 8192
+
+# Compiling a shape costs about as much as interpreting it a few dozen times, so a shape is interpreted until it has
+# been evaluated this many times, and compiled from then on. Shapes seen once, such as most queries, are never compiled.
+COMPILE_AFTER = 32
+
+# Number of times each shape not yet compiled has been evaluated. Emptied once it holds this many shapes.
+uses = {}
+MAX_USES = 65536
+
+
+def shape(expression):
+    """Returns the shape of the expression, and the names of its variables in the order they are written. The shape
+    lists the nodes of the syntax tree in prefix order, with the connective of each connective node and '-' or '' for
+    each variable, depending on whether it is negated. Expressions which differ only by their variables have the same
+    shape. Returns None if a leaf of the tree is not a single variable."""
+    symbols = []
+    names = []
+    stack = [syntax.parse(expression)]
+    while stack:
+        node = stack.pop()
+        if node.op is not None:
+            symbols.append(node.op)
+            stack.append(node.right)
+            stack.append(node.left)
+            continue
+        token = node.token
+        if token is None:
+            return None
+        name = token.lstrip("-")
+        symbols.append("-" if (len(token) - len(name)) % 2 else "")
+        names.append(name)
+    return tuple(symbols), names
+
+
+@lru_cache(maxsize=PROGRAM_CACHE_SIZE)
+def compile_shape(symbols, indexes):
+    """Compiles a shape into a Python function, given the number of the variable written at each leaf. The function
+    takes the value of each variable in order followed by a mask, and returns the value of the expression. Values can be
+    bools with a mask of True, ints holding one truth value per bit with a mask of all the bits used, or NumPy arrays of
+    bools with a mask of True. The function is a straight run of bitwise operations, one per node of the syntax tree,
+    so an expression of any depth compiles without nesting."""
+    # The shape is in prefix order, so it is read backwards, where each connective follows its operands, with a stack of
+    # the operands calculated so far. Reading it this way needs no recursion, so expressions of any depth compile.
+    lines = []
+    operands = []
+    leaves = reversed(indexes)
+    for symbol in reversed(symbols):
+        if symbol == "":
+            operands.append(f"v{next(leaves)}")
+            continue
+        if symbol == "-":
+            lines.append(f"    t{len(lines)} = v{next(leaves)} ^ mask")
+        else:
+            left = operands.pop()
+            right = operands.pop()
+            if symbol in DISJUNCTIONS:
+                lines.append(f"    t{len(lines)} = {left} | {right}")
+            else:
+                lines.append(f"    t{len(lines)} = ({left} ^ mask) | {right}")
+        operands.append(f"t{len(lines) - 1}")
+
+    arguments = ", ".join(f"v{i}" for i in range(max(indexes) + 1))
+    source = f"def program({arguments}, mask):\n" + "".join(line + "\n" for line in lines)
+    source += f"    return {operands.pop()}\n"
+    namespace = {}
+    exec(source, namespace)
+    return namespace["program"]
+
+
+def interpret(symbols, indexes, *arguments):
+    """Evaluates a shape in the same way as the program compile_shape would compile it, taking the shape and the number
+    of the variable at each leaf followed by the program's arguments."""
+    mask = arguments[-1]
+    operands = []
+    leaves = reversed(indexes)
+    for symbol in reversed(symbols):
+        if symbol == "":
+            operands.append(arguments[next(leaves)])
+        elif symbol == "-":
+            operands.append(arguments[next(leaves)] ^ mask)
+        elif symbol in DISJUNCTIONS:
+            operands.append(operands.pop() | operands.pop())
+        else:
+            operands.append((operands.pop() ^ mask) | operands.pop())
+    return operands.pop()
+
+
+def program(symbols, indexes):
+    """Returns a function evaluating a shape, as described in compile_shape. The shape is compiled once it has been
+    evaluated COMPILE_AFTER times, and interpreted until then."""
+    key = (symbols, indexes)
+    count = uses.get(key, 0) + 1
+    if count >= COMPILE_AFTER:
+        uses.pop(key, None)
+        return compile_shape(symbols, indexes)
+
+    if len(uses) >= MAX_USES:
+        uses.clear()
+    uses[key] = count
+    return partial(interpret, symbols, indexes)
+
+
+@lru_cache(maxsize=EVALUATOR_CACHE_SIZE)
+def cached_shape(expression):
+    """Returns the shape of an Expression, the number of the variable at each leaf, and the distinct variables in
+    order of first occurrence, or None if the expression cannot be evaluated. See evaluator."""
+    parsed = shape(expression)
+    if parsed is None:
+        return None
+    symbols, names = parsed
+    numbering = {}
+    indexes = tuple(numbering.setdefault(name, len(numbering)) for name in names)
+    return symbols, indexes, list(numbering)
+
+
+def evaluator(expression):
+    """Returns a program evaluating the expression, and the distinct variables of the expression in order of first
+    occurrence, which are the program's arguments (see compile_shape). Returns None if a leaf of the expression is not
+    a single variable. Compiled programs are shared by expressions of the same shape, i.e. across the theorem memory."""
+    parsed = cached_shape(as_expression(expression))
+    if parsed is None:
+        return None
+    symbols, indexes, variables = parsed
+    return program(symbols, indexes), variables
+
+
+def evaluate(expression, assignment):
+    """Returns the truth value of the expression under an assignment of True or False to each of its variables."""
+    program, variables = evaluator(expression)
+    return program(*(assignment[name] for name in variables), True)
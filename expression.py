@@ -0,0 +1,133 @@
+from array import array
+from collections.abc import Sequence
+
+# Token interning tables. Each distinct token (variable or connective) is given an integer id the first time it is
+# seen, so expressions can be stored as compact arrays of ids rather than lists of strings.
+token_ids = {}
+tokens = []
+
+
+def intern_token(token):
+    """Returns the integer id of a token, assigning the next free id if the token has not been seen before."""
+    token_id = token_ids.get(token)
+    if token_id is None:
+        token_id = len(tokens)
+        token_ids[token] = token_id
+        tokens.append(token)
+    return token_id
+
+
+MAIN_CONNECTIVE = intern_token(":>:")
+
+
+class Expression(Sequence):
+    """Immutable expression made up of interned token ids. Behaves as a sequence of token strings, so it can be used
+    wherever an expression list was used before, and is hashable so it can be used directly as a cache or index key.
+    The hash and the position of the main connective are calculated once, when the expression is created."""
+
+    __slots__ = ("_ids", "_hash", "_main", "_tree")
+
+    def __init__(self, expression=()):
+        if isinstance(expression, Expression):
+            ids = expression._ids
+        else:
+            ids = array("I", [intern_token(token) for token in expression])
+        self._set_ids(ids)
+
+    @classmethod
+    def from_ids(cls, ids):
+        """Creates an expression directly from an array of token ids."""
+        new = cls.__new__(cls)
+        new._set_ids(ids)
+        return new
+
+    def _set_ids(self, ids):
+        self._ids = ids
+        self._hash = hash(ids.tobytes())
+        self._tree = None
+
+        # Index of the main connective ':>:', or -1 if the expression does not have one.
+        try:
+            self._main = ids.index(MAIN_CONNECTIVE)
+        except ValueError:
+            self._main = -1
+
+    @property
+    def ids(self):
+        """The array of token ids making up the expression."""
+        return self._ids
+
+    @property
+    def main(self):
+        """Index of the main connective, or -1 if there is no main connective."""
+        return self._main
+
+    @property
+    def tree(self):
+        """The syntax tree of the expression, built the first time it is needed."""
+        if self._tree is None:
+            import syntax
+            self._tree = syntax.build_tree(self)
+        return self._tree
+
+    @property
+    def left(self):
+        """The sub-expression to the left of the main connective."""
+        if self._main < 0:
+            return self
+        return Expression.from_ids(self._ids[:self._main])
+
+    @property
+    def right(self):
+        """The sub-expression to the right of the main connective."""
+        if self._main < 0:
+            return self
+        return Expression.from_ids(self._ids[self._main + 1:])
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return Expression.from_ids(self._ids[index])
+        return tokens[self._ids[index]]
+
+    def __iter__(self):
+        return map(tokens.__getitem__, self._ids)
+
+    def __contains__(self, token):
+        token_id = token_ids.get(token)
+        return token_id is not None and token_id in self._ids
+
+    def __hash__(self):
+        return self._hash
+
+    def __eq__(self, other):
+        if isinstance(other, Expression):
+            return self._hash == other._hash and self._ids == other._ids
+        if isinstance(other, list):
+            return list(self) == other
+        return NotImplemented
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        if result is NotImplemented:
+            return result
+        return not result
+
+    def __reduce__(self):
+        # Token ids are only meaningful within one process, so expressions are pickled as their token strings.
+        return Expression, (list(self),)
+
+    def __str__(self):
+        return " ".join(self)
+
+    def __repr__(self):
+        return f"Expression({str(self)!r})"
+
+
+def as_expression(expression):
+    """Returns the expression as an Expression, without copying it if it already is one."""
+    if isinstance(expression, Expression):
+        return expression
+    return Expression(expression)
@@ -0,0 +1,123 @@
+import json
+import sys
+import time
+from bisect import bisect_left
+
+# Instrumentation for the proof methods. Metrics (per-method counters and timing histograms) are only recorded while
+# `enabled` is True, and trace events are only built while `tracing` is True, i.e. while at least one sink is
+# attached. Callers check these flags before doing any work, so instrumentation costs a single check when it is off.
+enabled = False
+tracing = False
+sinks = []
+
+# Upper bounds, in seconds, of the buckets of each timing histogram. The final bucket holds anything slower.
+BUCKETS = [1e-5, 3e-5, 1e-4, 3e-4, 1e-3, 3e-3, 1e-2, 3e-2, 1e-1, 3e-1, 1.0, float("inf")]
+
+# Counters for each method, i.e. counters["substitution"]["attempts"], and the timing histogram of each method.
+counters = {}
+histograms = {}
+
+
+def enable():
+    """Starts recording metrics."""
+    global enabled
+    enabled = True
+
+
+def disable():
+    """Stops recording metrics. The metrics recorded so far are kept."""
+    global enabled
+    enabled = False
+
+
+def reset():
+    """Discards all recorded metrics."""
+    counters.clear()
+    histograms.clear()
+
+
+def add_sink(sink):
+    """Attaches a sink, which is called with the kind and fields of each trace event."""
+    global tracing
+    sinks.append(sink)
+    tracing = True
+
+
+def remove_sink(sink):
+    """Detaches a sink."""
+    global tracing
+    sinks.remove(sink)
+    tracing = bool(sinks)
+
+
+def count(method, name, n=1):
+    """Adds n to one of the counters of a method."""
+    if not enabled:
+        return
+    method_counters = counters.setdefault(method, {})
+    method_counters[name] = method_counters.get(name, 0) + n
+
+
+def start():
+    """Returns the time to measure an attempt from, or 0 if metrics are not being recorded."""
+    if not enabled:
+        return 0
+    return time.perf_counter()
+
+
+def attempt(method, proved, started):
+    """Records an attempt of a method, whether it proved the expression, and its time taken since `started`."""
+    if not enabled:
+        return
+    count(method, "attempts")
+    if proved:
+        count(method, "successes")
+    histogram = histograms.setdefault(method, [0] * len(BUCKETS))
+    histogram[bisect_left(BUCKETS, time.perf_counter() - started)] += 1
+
+
+def event(kind, **fields):
+    """Sends a trace event to each sink. Callers should check `tracing` first, to avoid building the fields."""
+    for sink in sinks:
+        sink(kind, fields)
+
+
+def metrics():
+    """Returns a copy of the recorded metrics, with each histogram given as (bucket upper bound, count) pairs."""
+    return {
+        "counters": {method: dict(values) for method, values in counters.items()},
+        "histograms": {method: list(zip(BUCKETS, values)) for method, values in histograms.items()},
+    }
+
+
+# # SINKS
+
+
+def console_sink(kind, fields):
+    """Prints each event as a line of text, i.e. 'substitution.matched: axiom=3 expression=q v p :>: p v q'."""
+    details = " ".join(f"{name}={value}" for name, value in fields.items())
+    print(f"{kind}: {details}" if details else kind)
+
+
+def jsonable(value):
+    """Converts an event field to a value which can be written as JSON. Expressions are written as text."""
+    if isinstance(value, (int, float, bool, str, type(None))):
+        return value
+    if isinstance(value, (list, tuple)):
+        return [jsonable(item) for item in value]
+    return str(value)
+
+
+def json_sink(stream):
+    """Returns a sink which writes each event to the stream as a line of JSON."""
+    def sink(kind, fields):
+        record = {"event": kind, "time": time.time()}
+        record.update((name, jsonable(value)) for name, value in fields.items())
+        stream.write(json.dumps(record) + "\n")
+
+    return sink
+
+
+def report(stream=sys.stderr):
+    """Writes the recorded metrics to the stream as a line of JSON."""
+    stream.write(json.dumps(metrics()) + "\n")
@@ -0,0 +1,28 @@
+import time
+
+
+class BudgetExhausted(Exception):
+    """Raised at a checkpoint of a proof method once the budget of the query has run out."""
+
+
+class Budget:
+    """The wall time and number of steps a single query may use across all of the proof methods. A step is one unit of
+    work in a method's search, i.e. one theorem tried by the matching routine. Either limit may be None, for no limit.
+
+    The proof methods call spend at each checkpoint, which raises BudgetExhausted once either limit is reached, so a
+    query is abandoned part way through a method rather than when the method finishes."""
+
+    __slots__ = ("deadline", "max_steps", "steps")
+
+    def __init__(self, time_limit=None, max_steps=None):
+        self.deadline = time.perf_counter() + time_limit if time_limit is not None else None
+        self.max_steps = max_steps
+        self.steps = 0
+
+    def spend(self, steps=1):
+        """Checkpoint: counts the steps taken, and raises BudgetExhausted if the budget has run out."""
+        self.steps += steps
+        if self.max_steps is not None and self.steps > self.max_steps:
+            raise BudgetExhausted(f"Step limit of {self.max_steps} reached.")
+        if self.deadline is not None and time.perf_counter() > self.deadline:
+            raise BudgetExhausted("Time limit reached.")
@@ -0,0 +1,692 @@
+import atexit
+import heapq
+import sys
+import substitution
+import detachment
+import syntax
+import unification
+import store
+import canonical
+import tautology
+from theorems import axioms
+from expression import Expression, as_expression
+
+# The method of detachment compares against the right-hand side of each theorem, standardised so that its own main
+# connective becomes ':>:'. The theorems are indexed here by the pair of the left and right descriptions of their
+# standardised right subexpressions, so the candidates for detachment are retrieved with a single lookup, however many
+# theorems are stored.
+subexpression_index = {}
+
+# Discrimination trees over the theorem memory (see unification.py). The first holds each whole theorem, for the
+# method of substitution, with values of (key, number of the form of the theorem in its index entry). The second holds
+# the left side of each theorem, for the method of chaining, with the theorem key as the value.
+discrimination_tree = {}
+left_discrimination_tree = {}
+
+# Router of the shard processes holding the discrimination trees instead (see shards.py), or None if the trees are
+# held in this process.
+shard_router = None
+
+# Descriptions and discrimination tree entries recorded for each indexed theorem, allowing a theorem to be removed
+# from the indexes again.
+indexed = {}
+
+# Persistent theorem store attached to the theorem memory (see store.py), or None. The theorems in an attached store
+# are only loaded when the memory is next queried.
+attached_store = None
+store_loaded = True
+
+# Changes to the attached store are committed together, once this many have been written, rather than one transaction
+# per theorem. The rest are committed by flush, which is called when the store is detached and when the process exits.
+COMMIT_EVERY = 256
+unflushed = 0
+
+# The proof DAG of the theorem memory. Maps the key of each derived theorem to the method which proved it and the keys
+# of the theorems its proof used, so a proof refers to the theorems it depends on rather than copying them. The axioms
+# have no entry. Entries are kept when a theorem is evicted, as it keeps its key in the cold tier.
+derivations = {}
+
+# Canonical form (see canonical.py) of each stored theorem, mapped to the key of the first theorem with that form.
+# Theorems added which only differ from a stored theorem by the names of their variables are not stored again.
+canonical_forms = {}
+
+# Duplicates rejected by add_theorem, counted against the key of the stored theorem they duplicate, and totals of the
+# tokens and bytes of memory they would have taken up, and the candidates they would have added to index lookups.
+duplicate_counts = {}
+duplicate_tokens = 0
+duplicate_bytes = 0
+candidates_saved = 0
+
+# Expressions add_theorem has refused to store as they are not tautologies, so cannot be theorems.
+refuted = 0
+
+# Counts changes to the theorem memory, so results which depend on its contents can tell when they are out of date.
+generation = 0
+
+# The largest key indexed so far. New theorems are stored under the following key, so keys are never reused.
+last_key = 0
+
+# Theorems loaded from a library (see load_library) are kept under LIBRARY_KEYS plus their key in the library, rather
+# than after last_key, so they have the same keys each time the library is loaded, and derivations saved to the attached
+# store can refer to them. They are never saved to the store, so the cold tier keeps them in memory.
+LIBRARY_KEYS = 10 ** 9
+
+# Largest number of theorems kept in the theorem memory, or None for no limit. Once add_theorem takes the memory over
+# the limit, the least useful derived theorems are demoted to the cold tier, down to EVICT_TO of the limit, so theorems
+# are evicted in batches rather than one per theorem added. The original axioms are pinned, so they are never evicted.
+capacity = None
+EVICT_TO = 0.9
+pinned = set(axioms)
+
+# Usefulness of each theorem while the memory is bounded: one for each lookup which retrieves it as a candidate, and
+# PROOF_USE_WEIGHT for each proof which uses it. The least useful theorem is evicted first, and the oldest of equally
+# useful theorems.
+PROOF_USE_WEIGHT = 10
+uses = {}
+
+# Whether uses has changed since it was last saved to the attached store, which is done when the store is flushed.
+uses_changed = False
+
+# The cold tier holds the theorems evicted from the theorem memory. They are not indexed, so they cost nothing in any
+# lookup, but a theorem proved again is promoted back under its old key rather than stored again. Maps the canonical
+# form of each cold theorem to its key, and each key to the theorem and its index entry. The theorem and entry are left
+# in the attached store instead, if there is one, which records the theorem as cold so it stays in the cold tier when
+# the store is loaded again.
+cold_forms = {}
+cold = {}
+
+# Totals of the lookups made, the candidates they retrieved, the uses of theorems in proofs, and the theorems evicted
+# and promoted again. See usage_report.
+lookups = 0
+candidates_retrieved = 0
+proof_uses = 0
+evictions = 0
+promotions = 0
+
+
+def _add_to_index(index, key, d):
+    """Appends the theorem key to the bucket of the index for the description d."""
+    if d in index:
+        index[d].append(key)
+    else:
+        index[d] = [key]
+
+
+def _remove_from_index(index, key, d):
+    """Removes the theorem key from the bucket of the index for the description d."""
+    bucket = index[d]
+    bucket.remove(key)
+    if not bucket:
+        del index[d]
+
+
+def right_subexpression_descriptions(theorem):
+    """Returns the left and right descriptions of the standardised right subexpression of a theorem, or None if the
+    right subexpression has no main connective of its own."""
+    right = detachment.get_right_subexpression(theorem)
+    if ".v." not in right and ".>." not in right:
+        return None
+
+    standardised = detachment.standardise_subexpression(right)
+    if ":>:" not in standardised:
+        return None
+
+    return substitution.description_left(standardised), substitution.description_right(standardised)
+
+
+def substitution_forms(theorem):
+    """Returns the forms of a theorem which the method of substitution matches against: the theorem itself and, if it
+    contains 'v', the theorem with 'v' replaced by '>' using the replacement routine. The replaced form is only used
+    where it means the same as the theorem (see substitution.replaceable_or), as any other is not a theorem."""
+    forms = [theorem]
+    if "v" in theorem and substitution.replaceable_or(theorem):
+        forms.append(substitution.replacement_or(theorem))
+    return forms
+
+
+def theorem_entry(theorem):
+    """Calculates the index entry of a theorem once: its left, right and whole descriptions, the descriptions of its
+    standardised right subexpression, and its discrimination tree symbols with the form of the theorem each is for."""
+    dl = substitution.description_left(theorem)
+    dr = substitution.description_right(theorem)
+    d = substitution.description(theorem)
+    sub = right_subexpression_descriptions(theorem)
+    patterns = [(unification.pattern_symbols(syntax.parse(form)), form) for form in substitution_forms(theorem)]
+    left_symbols = unification.pattern_symbols(syntax.parse(theorem).main_left)
+    canonical_form = canonical.alpha_normalise(theorem)
+    return dl, dr, d, sub, patterns, left_symbols, canonical_form
+
+
+def without_symbols(entry):
+    """Drops the discrimination tree symbols from an index entry, keeping the forms of the theorem. The entries of the
+    theorems in memory are kept like this while the shards hold the discrimination trees, so the symbols are only held
+    by the shards."""
+    dl, dr, d, sub, patterns, left_symbols, canonical_form = entry
+    return dl, dr, d, sub, [(None, form) for symbols, form in patterns], None, canonical_form
+
+
+def with_symbols(entry):
+    """Returns an index entry with its discrimination tree symbols, calculating them again from the forms of the
+    theorem if they were dropped (see without_symbols). The first form is the theorem itself."""
+    dl, dr, d, sub, patterns, left_symbols, canonical_form = entry
+    if left_symbols is not None:
+        return entry
+    patterns = [(unification.pattern_symbols(syntax.parse(form)), form) for symbols, form in patterns]
+    left_symbols = unification.pattern_symbols(syntax.parse(patterns[0][1]).main_left)
+    return dl, dr, d, sub, patterns, left_symbols, canonical_form
+
+
+def tree_entries(key, entry):
+    """Returns (tree name, pattern symbols, value) for each entry of a theorem in the discrimination trees, as sent to
+    the shards (see shards.py)."""
+    patterns, left_symbols = entry[4], entry[5]
+    entries = [("whole", symbols, (key, number)) for number, (symbols, form) in enumerate(patterns)]
+    entries.append(("left", left_symbols, key))
+    return entries
+
+
+def enter_theorem(key, entry):
+    """Enters a theorem into each of the indexes using its index entry."""
+    entry = with_symbols(entry)
+    dl, dr, d, sub, patterns, left_symbols, canonical_form = entry
+    canonical_forms.setdefault(canonical_form, key)
+    if shard_router is not None:
+        shard_router.insert(tree_entries(key, entry))
+        entry = without_symbols(entry)
+    else:
+        for number, (symbols, form) in enumerate(patterns):
+            unification.insert(discrimination_tree, symbols, (key, number))
+        unification.insert(left_discrimination_tree, left_symbols, key)
+
+    if sub:
+        _add_to_index(subexpression_index, key, sub)
+
+    indexed[key] = entry
+
+    global last_key, generation
+    if key < LIBRARY_KEYS:
+        last_key = max(last_key, key)
+    generation += 1
+
+
+def index_theorem(key):
+    """Calculates the index entry of a theorem in the axioms dictionary, and enters the theorem into each of the
+    indexes. The theorem is stored as an Expression if it is not one already."""
+    theorem = as_expression(axioms[key])
+    axioms[key] = theorem
+    entry = theorem_entry(theorem)
+    enter_theorem(key, entry)
+    if attached_store is not None:
+        store.save_theorem(attached_store, key, theorem, entry)
+        written()
+
+
+def unindex_theorem(key):
+    """Removes a theorem from each of the indexes."""
+    global generation
+    generation += 1
+    entry = indexed.pop(key)
+    dl, dr, d, sub, patterns, left_symbols, canonical_form = entry
+    if canonical_forms.get(canonical_form) == key:
+        del canonical_forms[canonical_form]
+    duplicate_counts.pop(key, None)
+    if shard_router is not None:
+        shard_router.remove(tree_entries(key, with_symbols(entry)))
+    else:
+        for number, (symbols, form) in enumerate(patterns):
+            unification.remove(discrimination_tree, symbols, (key, number))
+        unification.remove(left_discrimination_tree, left_symbols, key)
+    if sub:
+        _remove_from_index(subexpression_index, key, sub)
+
+
+def written(changes=1):
+    """Counts changes written to the attached store, committing them once COMMIT_EVERY have been written."""
+    global unflushed
+    unflushed += changes
+    if unflushed >= COMMIT_EVERY:
+        flush()
+
+
+def flush():
+    """Commits the changes written to the attached store which are not yet committed, saving the uses of the theorems
+    in memory first if they have changed."""
+    global unflushed, uses_changed
+    if attached_store is not None:
+        if uses_changed:
+            store.save_usage(attached_store, ((key, count, 0) for key, count in uses.items()
+                                              if key in axioms and key < LIBRARY_KEYS))
+            unflushed += 1
+        if unflushed:
+            attached_store.commit()
+    unflushed = 0
+    uses_changed = False
+
+
+atexit.register(flush)
+
+
+def attach(path):
+    """Attaches the persistent theorem store at the given path. The theorems already in the store are loaded the next
+    time the memory is queried, and every theorem indexed from then on is saved to the store."""
+    global attached_store, store_loaded
+    attached_store = store.open_store(path)
+    store_loaded = False
+
+
+def detach():
+    """Detaches the persistent theorem store, leaving the theorems loaded from it in memory. The evicted theorems left
+    in the store are read back into the cold tier first, and any changes not yet committed are committed."""
+    global attached_store, store_loaded
+    if attached_store is None:
+        return
+    flush()
+    for key in [key for key, cold_entry in cold.items() if cold_entry is None]:
+        text, entry = store.load_theorem(attached_store, key)
+        theorem = Expression(text.split())
+        cold[key] = (theorem, stored_entry(theorem, text, entry))
+    attached_store.close()
+    attached_store = None
+    store_loaded = True
+
+
+def forget_store():
+    """Drops the attached store without reading from or writing to it. Used in a process forked from the one which
+    attached the store, which must not use the connection it inherited; changes not yet committed are left for the
+    parent process to commit."""
+    global attached_store, store_loaded, unflushed
+    attached_store = None
+    store_loaded = True
+    unflushed = 0
+
+
+def stored_entry(theorem, text, entry):
+    """Converts the forms and canonical form of an index entry read from the store to Expressions, reusing the theorem
+    itself for the form which is the theorem. A replaced form which does not mean the same as the theorem, as stored
+    before substitution_forms checked for them, is dropped."""
+    dl, dr, d, sub, patterns, left_symbols, canonical_form = entry
+    if len(patterns) > 1 and not substitution.replaceable_or(theorem):
+        patterns = [(symbols, form) for symbols, form in patterns if form == text]
+    patterns = [(symbols, theorem if form == text else Expression(form.split())) for symbols, form in patterns]
+    return dl, dr, d, sub, patterns, left_symbols, Expression(canonical_form.split())
+
+
+def load_store():
+    """Loads the theorems in the attached store into the theorem memory. Each theorem is entered into the indexes using
+    the index entry saved with it, so none of the stored theorems are parsed or described again. Theorems in memory
+    which are not yet in the store, such as the initial axioms, are then saved to it, as is the proof DAG.
+
+    Theorems which were evicted are put straight back in the cold tier, without being read, and the recorded uses of
+    the others are restored if the memory is bounded, so a bounded memory is loaded as it was left."""
+    global store_loaded, last_key
+    store_loaded = True
+
+    for key, canonical_form in store.load_cold(attached_store):
+        if key not in axioms:
+            cold_forms[Expression(canonical_form.split())] = key
+            cold[key] = None
+            last_key = max(last_key, key)
+
+    saved = set()
+    for key, text, entry in store.load_theorems(attached_store):
+        saved.add(key)
+        theorem = Expression(text.split())
+        if key in axioms:
+            if axioms[key] != theorem:
+                raise ValueError(f"Theorem {key} in the store does not match theorem {key} in memory.")
+            continue
+
+        axioms[key] = theorem
+        enter_theorem(key, stored_entry(theorem, text, entry))
+
+    for key, method, parents in store.load_derivations(attached_store):
+        derivations.setdefault(key, (method, parents))
+
+    if capacity is not None:
+        for key, count in store.load_usage(attached_store).items():
+            if key in axioms and count:
+                uses[key] = uses.get(key, 0) + count
+
+    for key in axioms:
+        if key not in saved:
+            if key in indexed:
+                store.save_theorem(attached_store, key, axioms[key], with_symbols(indexed[key]))
+                written()
+            else:
+                index_theorem(key)
+            if key in derivations:
+                store.save_derivation(attached_store, key, *derivations[key])
+                written()
+
+    enforce_capacity()
+    flush()
+
+
+def load_library(path):
+    """Loads the theorems of a library written by saturate.py into the theorem memory, using the index entry saved with
+    each theorem. A theorem which only differs from a theorem already in memory by the names of its variables, such
+    as each of the axioms, is skipped. The others are stored under their key in the library plus LIBRARY_KEYS, and are
+    not saved to the attached store, as they are kept in the library. The derivations in the library are added to the
+    proof DAG, with the keys of their parents changed to match. Raises ValueError if a key is already used by another
+    theorem, as when two libraries are loaded. Returns the number of theorems loaded."""
+    update_indexes()
+    connection = store.open_store(path)
+
+    # Maps the key of each theorem in the library to its key in memory, and records the keys of the theorems loaded.
+    keys = {}
+    loaded = set()
+    try:
+        for library_key, text, entry in store.load_theorems(connection):
+            canonical_form = Expression(entry[-1].split())
+            if canonical_form in canonical_forms:
+                keys[library_key] = canonical_forms[canonical_form]
+                continue
+            theorem = Expression(text.split())
+            key = keys[library_key] = LIBRARY_KEYS + library_key
+            if key in axioms or key in cold:
+                raise ValueError(f"Theorem {library_key} of the library {path} has the same key as theorem {key} in "
+                                 f"memory.")
+            axioms[key] = theorem
+            enter_theorem(key, stored_entry(theorem, text, entry))
+            loaded.add(key)
+
+        for library_key, method, parents in store.load_derivations(connection):
+            if keys.get(library_key) in loaded:
+                derivations[keys[library_key]] = (method, tuple(keys.get(parent, parent) for parent in parents))
+    finally:
+        connection.close()
+
+    enforce_capacity()
+    return len(loaded)
+
+
+def update_indexes():
+    """Indexes any theorems which have been entered into the axioms dictionary directly, rather than through
+    add_theorem. The initial axioms are indexed this way the first time the memory is queried, after loading the
+    attached store if there is one."""
+    if not store_loaded:
+        load_store()
+
+    if len(indexed) == len(axioms):
+        return
+
+    for key in axioms:
+        if key not in indexed:
+            index_theorem(key)
+
+
+def clear_indexes():
+    """Empties each of the indexes, and the cold tier. Used when the contents of the axioms dictionary are replaced,
+    after which the theorems are indexed again the next time the memory is queried."""
+    global last_key, generation
+    generation += 1
+    for index in (subexpression_index, discrimination_tree, left_discrimination_tree, indexed, canonical_forms,
+                  duplicate_counts, uses, cold_forms, cold, derivations):
+        index.clear()
+    last_key = 0
+    if shard_router is not None:
+        shard_router.clear()
+
+
+def attach_shards(router):
+    """Moves the discrimination trees of the theorem memory to the shards of a ShardRouter (see shards.py), which then
+    hold every theorem indexed from now on, and answer unifiable and left_unifiable. The discrimination tree symbols are
+    dropped from the index entries in this process, as only the shards need them."""
+    global shard_router
+    update_indexes()
+    router.insert([tree_entry for key, entry in indexed.items() for tree_entry in tree_entries(key, entry)])
+    shard_router = router
+    discrimination_tree.clear()
+    left_discrimination_tree.clear()
+    for key, entry in indexed.items():
+        indexed[key] = without_symbols(entry)
+
+
+def detach_shards():
+    """Moves the discrimination trees back from the shards into this process, emptying the shards."""
+    global shard_router
+    if shard_router is None:
+        return
+    shard_router.clear()
+    shard_router = None
+    for key, entry in indexed.items():
+        entry = indexed[key] = with_symbols(entry)
+        for number, (symbols, form) in enumerate(entry[4]):
+            unification.insert(discrimination_tree, symbols, (key, number))
+        unification.insert(left_discrimination_tree, entry[5], key)
+
+
+def add_theorem(expression, method=None, parents=()):
+    """Stores a proved expression in the theorem memory and indexes it, saving it to the attached store if there is
+    one. Returns the key of the new theorem. If the expression only differs from a stored theorem by the names of its
+    variables, it is not stored and the key of the stored theorem is returned instead.
+
+    An expression which is not a tautology is never stored, and None is returned, so a faulty proof cannot be used to
+    prove anything else. Expressions whose truth table cannot be calculated (see tautology.is_tautology) are stored.
+
+    The method which proved the expression and the keys of the theorems used in its proof are recorded in the proof
+    DAG, if a method is given. A theorem which was already stored keeps the derivation it was first stored with."""
+    global duplicate_tokens, duplicate_bytes, refuted
+    update_indexes()
+
+    expression = as_expression(expression)
+    existing = canonical_forms.get(canonical.alpha_normalise(expression))
+    if existing is not None:
+        duplicate_counts[existing] = duplicate_counts.get(existing, 0) + 1
+        duplicate_tokens += len(expression)
+        duplicate_bytes += sys.getsizeof(expression) + sys.getsizeof(expression.ids)
+        return existing
+
+    # A theorem which was evicted is promoted back from the cold tier rather than stored under a new key.
+    evicted = cold_forms.get(canonical.alpha_normalise(expression))
+    if evicted is not None:
+        promote(evicted)
+        enforce_capacity(keep=evicted)
+        return evicted
+
+    if tautology.is_tautology(expression) is False:
+        refuted += 1
+        return None
+
+    key = last_key + 1
+    axioms[key] = expression
+    if method is not None:
+        record_derivation(key, method, parents)
+    index_theorem(key)
+    enforce_capacity()
+    return key
+
+
+def record_derivation(key, method, parents):
+    """Records the method and the parent theorems of a derived theorem in the proof DAG, saving them to the attached
+    store if there is one."""
+    derivations[key] = (method, tuple(parents or ()))
+    if attached_store is not None:
+        store.save_derivation(attached_store, key, method, derivations[key][1])
+        written()
+
+
+def derivation(key):
+    """Returns the method which proved a theorem and the keys of its parent theorems, or None for an axiom."""
+    update_indexes()
+    return derivations.get(key)
+
+
+def ancestry(key):
+    """Returns the derivation of the theorem and of every theorem its proof depends on, directly or through other
+    theorems, as a dictionary keyed on theorem key. Each theorem appears once, however many proofs share it."""
+    update_indexes()
+    found = {}
+    stack = [key]
+    while stack:
+        current = stack.pop()
+        if current in found:
+            continue
+        found[current] = derivations.get(current)
+        if found[current] is not None:
+            stack.extend(found[current][1])
+    return found
+
+
+def remove_theorem(key):
+    """Removes a theorem from the theorem memory and from the indexes, or from the cold tier if it has been evicted."""
+    update_indexes()
+    if key in axioms:
+        unindex_theorem(key)
+        del axioms[key]
+    else:
+        cold.pop(key, None)
+        for form in [form for form, cold_key in cold_forms.items() if cold_key == key]:
+            del cold_forms[form]
+    uses.pop(key, None)
+    derivations.pop(key, None)
+    if attached_store is not None:
+        store.delete_theorem(attached_store, key)
+        written()
+
+
+def set_capacity(limit):
+    """Bounds the theorem memory to the given number of theorems, or removes the bound if limit is None. Evicts
+    theorems straight away if the memory is already over the new limit."""
+    global capacity
+    capacity = limit
+    if capacity is None:
+        uses.clear()
+    else:
+        enforce_capacity()
+
+
+def usefulness(key):
+    """Sort key for eviction: the usefulness of the theorem, then its key, so the oldest theorem goes first."""
+    return uses.get(key, 0), key
+
+
+def enforce_capacity(keep=None):
+    """Demotes the least useful derived theorems to the cold tier if the theorem memory is over its capacity. The
+    theorem with the key given as keep, such as one just promoted, is not demoted, as it would otherwise be the first to
+    go: it has not been used since it was demoted, and it is older than the other theorems which have not."""
+    global evictions
+    update_indexes()
+    if capacity is None or len(axioms) <= capacity:
+        return
+
+    target = int(capacity * EVICT_TO)
+    evictable = [key for key in axioms if key not in pinned and key != keep]
+    evicted = heapq.nsmallest(len(axioms) - target, evictable, key=usefulness)
+    for key in evicted:
+        entry = indexed[key]
+        theorem = axioms[key]
+        unindex_theorem(key)
+        del axioms[key]
+        uses.pop(key, None)
+        cold_forms[entry[-1]] = key
+        # A library theorem is not in the store, so it cannot be read back from there.
+        cold[key] = None if attached_store is not None and key < LIBRARY_KEYS else (theorem, entry)
+        evictions += 1
+
+    if attached_store is not None:
+        rows = [(key, 0, 1) for key in evicted if key < LIBRARY_KEYS]
+        store.save_usage(attached_store, rows)
+        written(len(rows))
+
+
+def promote(key):
+    """Moves an evicted theorem from the cold tier back into the theorem memory, under its old key."""
+    global promotions
+    cold_entry = cold.pop(key)
+    if cold_entry is None:
+        text, entry = store.load_theorem(attached_store, key)
+        theorem = Expression(text.split())
+        entry = stored_entry(theorem, text, entry)
+    else:
+        theorem, entry = cold_entry
+    del cold_forms[entry[-1]]
+    axioms[key] = theorem
+    enter_theorem(key, entry)
+    promotions += 1
+    if attached_store is not None and key < LIBRARY_KEYS:
+        store.save_usage(attached_store, [(key, 0, 0)])
+        written()
+
+
+def record_use(keys):
+    """Records that the theorems with the given keys were used in a proof."""
+    global proof_uses, uses_changed
+    if not keys:
+        return
+    proof_uses += len(keys)
+    if capacity is not None:
+        uses_changed = True
+        for key in keys:
+            if key in axioms:
+                uses[key] = uses.get(key, 0) + PROOF_USE_WEIGHT
+
+
+def retrieved(keys):
+    """Records a lookup retrieving the given keys as candidates, for usage_report and, while the theorem memory is
+    bounded, for the usefulness of each theorem."""
+    global lookups, candidates_retrieved, uses_changed
+    lookups += 1
+    candidates_retrieved += len(keys)
+    if capacity is not None:
+        uses_changed = True
+        for key in keys:
+            uses[key] = uses.get(key, 0) + 1
+    return count_saved(keys)
+
+
+def usage_report():
+    """Reports the size of the theorem memory and its cold tier, the theorems evicted and promoted again, and the
+    trade-off between them: the mean candidates retrieved per lookup (the cost of scanning the memory), and the share
+    of retrieved candidates which were used in a proof (its hit rate)."""
+    return {"capacity": capacity, "theorems": len(axioms), "pinned": len(pinned), "cold": len(cold),
+            "evictions": evictions, "promotions": promotions, "lookups": lookups,
+            "candidates": candidates_retrieved, "proof_uses": proof_uses,
+            "scan_cost": candidates_retrieved / lookups if lookups else 0.0,
+            "hit_rate": proof_uses / candidates_retrieved if candidates_retrieved else 0.0}
+
+
+def count_saved(keys):
+    """Counts the candidates which rejected duplicates of the given theorems would have added to a lookup."""
+    global candidates_saved
+    if duplicate_counts:
+        for key in keys:
+            candidates_saved += duplicate_counts.get(key, 0)
+    return keys
+
+
+def duplicate_report():
+    """Reports how many duplicate theorems add_theorem has rejected, the tokens and bytes of memory they would have
+    taken up, and the candidates they would have added to the lookups made since, along with the number of expressions
+    it refused as they are not tautologies."""
+    return {"rejected": sum(duplicate_counts.values()), "tokens": duplicate_tokens, "bytes": duplicate_bytes,
+            "candidates": candidates_saved, "refuted": refuted}
+
+
+def subexpression_matches(dl, dr):
+    """Returns the keys of the theorems whose standardised right subexpression has left description dl and right
+    description dr."""
+    update_indexes()
+    return retrieved(list(subexpression_index.get((dl, dr), [])))
+
+
+def unifiable(tree):
+    """Returns (key, form of the theorem) for each stored theorem that the expression with the given syntax tree could
+    be an instance of, in order of key."""
+    update_indexes()
+    if shard_router is not None:
+        found = shard_router.retrieve("whole", tree)
+    else:
+        found = unification.retrieve(discrimination_tree, tree)
+    candidates = [(key, indexed[key][4][number][1]) for key, number in sorted(found)]
+    retrieved([key for key, form in candidates])
+    return candidates
+
+
+def left_unifiable(tree):
+    """Returns the keys of the stored theorems whose left side the expression with the given syntax tree could be an
+    instance of, in order of key."""
+    update_indexes()
+    if shard_router is not None:
+        return retrieved(sorted(shard_router.retrieve("left", tree)))
+    return retrieved(sorted(unification.retrieve(left_discrimination_tree, tree)))
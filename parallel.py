@@ -0,0 +1,112 @@
+import argparse
+import contextlib
+import multiprocessing
+import os
+import sys
+from functools import partial
+from itertools import islice
+
+import batch
+import memory
+from expression import Expression
+from theorems import axioms, expressions
+
+
+def init_worker(snapshot):
+    """Runs once in each worker process, replacing the worker's theorem memory with the snapshot of the parent's
+    theorem memory taken when the pool was started. The parent's theorem store is left to the parent."""
+    memory.forget_store()
+    axioms.clear()
+    axioms.update(snapshot)
+    memory.clear_indexes()
+
+
+def prove_task(task, time_limit=None, max_steps=None):
+    """Proves a single (id, expression) pair in a worker. Expressions proved by a worker are not added to its own
+    theorem memory, so every worker proves against the same snapshot and the results do not depend on which worker
+    received which expression."""
+    key, expression = task
+    return batch.prove(key, expression, store=False, time_limit=time_limit, max_steps=max_steps)
+
+
+def merge_result(record, store=True):
+    """Adds an expression proved by a worker to the theorem memory of the parent process, recording the use of the
+    theorems in its proof."""
+    if record["proved"]:
+        memory.record_use(record["theorems"])
+        if store:
+            record["stored"] = memory.add_theorem(Expression(record["proof"].split()), record["method"],
+                                                  record["theorems"])
+    return record
+
+
+def prove_parallel(tasks, processes=None, chunksize=64, store=True, time_limit=None, max_steps=None):
+    """Proves a stream of (id, expression) pairs over a pool of worker processes, yielding the results in input order.
+    The input is sent to the pool in windows of a few chunks per worker, so neither the input nor the output is held in
+    memory all at once, and each chunk of expressions is sent to a worker in a single message. Proved expressions are
+    merged into the theorem memory in input order, so the final theorem memory is the same on every run."""
+    processes = processes or os.cpu_count()
+    window = chunksize * processes * 4
+    memory.update_indexes()
+    # The theorem store is committed before the workers are forked, so none of them inherits a transaction in progress.
+    memory.flush()
+    snapshot = dict(axioms)
+    task = partial(prove_task, time_limit=time_limit, max_steps=max_steps)
+
+    tasks = iter(tasks)
+    with multiprocessing.Pool(processes, initializer=init_worker, initargs=(snapshot,)) as pool:
+        block = list(islice(tasks, window))
+        while block:
+            for record in pool.imap(task, block, chunksize):
+                yield merge_result(record, store=store)
+            block = list(islice(tasks, window))
+
+
+def replicated_expressions(copies):
+    """Streams the bundled example expressions repeated the given number of times, numbered in order."""
+    key = 0
+    for _ in range(copies):
+        for expression in expressions.values():
+            key += 1
+            yield key, Expression(expression)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Prove a batch of expressions over a pool of worker processes, "
+                                                 "writing one JSON result per line in input order.")
+    parser.add_argument("input", nargs="?", default="-", help="input file, or '-' for stdin (default)")
+    parser.add_argument("-o", "--output", default="-", help="output file, or '-' for stdout (default)")
+    parser.add_argument("-p", "--processes", type=int, default=None, help="number of worker processes")
+    parser.add_argument("-c", "--chunksize", type=int, default=64, help="expressions sent to a worker at once")
+    parser.add_argument("--replicate", type=int, default=0,
+                        help="prove the bundled example expressions this many times instead of reading input")
+    parser.add_argument("--no-store", action="store_true",
+                        help="do not add proved expressions to the theorem memory")
+    parser.add_argument("--time-limit", type=float, default=None, help="seconds allowed to prove each expression")
+    parser.add_argument("--max-steps", type=int, default=None, help="steps allowed to prove each expression")
+    parser.add_argument("--theorem-store", help="persistent theorem store to load and save the theorem memory to")
+    parser.add_argument("--capacity", type=int, default=None,
+                        help="largest number of theorems kept in the theorem memory, evicting the least used")
+    parser.add_argument("--library", help="library of derived theorems written by saturate.py, to load at start up")
+    args = parser.parse_args(argv)
+
+    if args.theorem_store:
+        memory.attach(args.theorem_store)
+    if args.library:
+        memory.load_library(args.library)
+    memory.set_capacity(args.capacity)
+
+    with contextlib.ExitStack() as stack:
+        if args.replicate:
+            tasks = replicated_expressions(args.replicate)
+        else:
+            source = sys.stdin if args.input == "-" else stack.enter_context(open(args.input))
+            tasks = batch.read_expressions(source)
+        target = sys.stdout if args.output == "-" else stack.enter_context(open(args.output, "w"))
+        results = prove_parallel(tasks, processes=args.processes, chunksize=args.chunksize,
+                                 store=not args.no_store, time_limit=args.time_limit, max_steps=args.max_steps)
+        batch.write_results(results, target)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+import multiprocessing
+import time
+from multiprocessing.connection import wait
+
+import LT
+import limits
+import instrumentation
+import memory
+
+# Statistics of the races run so far: the number of races, the races won by each method, and the total time each
+# method took to win. Used to tune the order the executive routine attempts the methods in (see LT.METHODS).
+races = 0
+wins = {}
+win_times = {}
+
+
+def run_method(method, proof_method, expression, time_limit, max_steps, connection):
+    """Runs in a child process, attempting the expression with a single method and sending (method, outcome, proof,
+    keys) back to the parent. The outcome is "proved", "failed", "exhausted" or the exception raised by the method."""
+    # The child's copies of the trace sinks are dropped, so events are not written twice to the parent's streams.
+    instrumentation.sinks.clear()
+    instrumentation.tracing = False
+    # Nor does the child use the parent's connection to the theorem store (see memory.forget_store).
+    memory.forget_store()
+    try:
+        proof, keys = proof_method(expression, budget=limits.Budget(time_limit, max_steps))
+    except limits.BudgetExhausted:
+        connection.send((method, "exhausted", None, None))
+    except Exception as error:
+        connection.send((method, error, None, None))
+    else:
+        connection.send((method, "proved" if proof else "failed", proof or None, keys))
+    connection.close()
+
+
+def race(expression, time_limit=None, max_steps=None):
+    """Attempts the expression with every method at once, each in its own process, and returns the first proof found.
+    The remaining processes are then terminated. Each method has its own step limit, but the time limit is shared.
+
+    Returns a dictionary of the method which won, the proof and the keys of the theorems used, with "exhausted"
+    recording a method which ran out of budget if no method proved the expression. If no method proved the expression
+    and one raised an exception, the exception is raised again here. The child processes are forked, so each one
+    proves against the theorem memory as it is when the race starts. Raises RuntimeError if the discrimination trees
+    are held by shards, as the children could not query them (see shards.ShardRouter.check_owner)."""
+    global races
+    if memory.shard_router is not None:
+        raise RuntimeError("The methods cannot be raced while the theorem memory is sharded.")
+    # The theorem memory is loaded, and its changes committed, before the children are forked, so they neither load
+    # the store again nor commit the parent's changes.
+    memory.update_indexes()
+    memory.flush()
+    context = multiprocessing.get_context("fork")
+    deadline = time.perf_counter() + time_limit if time_limit is not None else None
+    outcome = {"method": None, "proof": None, "theorems": None, "exhausted": None}
+    error = None
+
+    # Maps the receiving end of each child's pipe to its method and process.
+    running = {}
+    started = time.perf_counter()
+    try:
+        for method, proof_method in LT.METHODS:
+            receiver, sender = context.Pipe(duplex=False)
+            process = context.Process(target=run_method, daemon=True,
+                                      args=(method, proof_method, expression, time_limit, max_steps, sender))
+            process.start()
+            sender.close()
+            running[receiver] = (method, process)
+
+        while running and outcome["proof"] is None:
+            timeout = max(0.0, deadline - time.perf_counter()) if deadline is not None else None
+            ready = wait(list(running), timeout)
+            if not ready:
+                # The time limit has run out, so the attempt is exhausted in the first method still running.
+                remaining = {method for method, _ in running.values()}
+                outcome["exhausted"] = next(method for method, _ in LT.METHODS if method in remaining)
+                break
+
+            for receiver in ready:
+                method, process = running.pop(receiver)
+                try:
+                    _, result, proof, keys = receiver.recv()
+                except EOFError:
+                    result, proof, keys = RuntimeError(f"The {method} process exited without a result."), None, None
+                receiver.close()
+
+                if result == "proved" and outcome["proof"] is None:
+                    outcome.update(method=method, proof=proof, theorems=keys)
+                elif result == "exhausted":
+                    outcome["exhausted"] = outcome["exhausted"] or method
+                elif isinstance(result, Exception):
+                    error = error or result
+
+    finally:
+        for receiver, (method, process) in running.items():
+            process.terminate()
+            receiver.close()
+        for method, process in running.values():
+            process.join()
+
+    races += 1
+    if outcome["proof"] is not None:
+        outcome["exhausted"] = None
+        elapsed = time.perf_counter() - started
+        wins[outcome["method"]] = wins.get(outcome["method"], 0) + 1
+        win_times[outcome["method"]] = win_times.get(outcome["method"], 0.0) + elapsed
+        instrumentation.count("portfolio", f"{outcome['method']}_wins")
+        if instrumentation.tracing:
+            instrumentation.event("portfolio.won", expression=expression, method=outcome["method"], time=elapsed)
+    elif error is not None and outcome["exhausted"] is None:
+        raise error
+
+    return outcome
+
+
+def statistics():
+    """Returns the number of races run, and for each method the races it won, the fraction of races it won and its
+    mean time to win in seconds."""
+    return {
+        "races": races,
+        "methods": {method: {"wins": wins.get(method, 0),
+                             "share": wins.get(method, 0) / races if races else 0.0,
+                             "mean_time": win_times[method] / wins[method] if wins.get(method) else None}
+                    for method, _ in LT.METHODS},
+    }
+
+
+def clear_statistics():
+    """Discards the statistics of the races run so far."""
+    global races
+    races = 0
+    wins.clear()
+    win_times.clear()
@@ -0,0 +1,79 @@
+from collections import OrderedDict
+
+import canonical
+import memory
+
+# Maximum number of results kept in the proof cache. The least recently used result is discarded once the cache is
+# full. Can be changed with resize.
+PROOF_CACHE_SIZE = 4096
+
+# The proof cache maps the canonical form of each expression attempted by the executive routine to the generation of
+# the theorem memory when it was attempted, and to the result with its variables in canonical form. A successful proof
+# remains valid as the theorem memory grows, but a failure is only valid until the theorem memory next changes.
+cache = OrderedDict()
+maxsize = PROOF_CACHE_SIZE
+hits = 0
+misses = 0
+
+
+def lookup(expression):
+    """Returns the cached result for the expression, or any expression differing from it only by the names of its
+    variables, with the proof renamed to the variables of the expression. Returns None if there is no valid result."""
+    global hits, misses
+    renaming = canonical.variable_renaming(expression)
+    key = canonical.rename(expression, renaming)
+
+    entry = cache.get(key)
+    if entry is not None:
+        generation, result = entry
+        if result["proof"] is not None or generation == memory.generation:
+            cache.move_to_end(key)
+            hits += 1
+            restored = dict(result)
+            if result["proof"] is not None:
+                inverse = {name: variable for variable, name in renaming.items()}
+                restored["proof"] = canonical.rename(result["proof"], inverse)
+            return restored
+
+        del cache[key]
+
+    misses += 1
+    return None
+
+
+def record(expression, result):
+    """Caches the method, proof and theorems of a result from the executive routine, keyed on the canonical form of
+    the expression."""
+    renaming = canonical.variable_renaming(expression)
+    key = canonical.rename(expression, renaming)
+
+    cached = {"method": result["method"], "proof": result["proof"], "theorems": result["theorems"]}
+    if cached["proof"] is not None:
+        cached["proof"] = canonical.rename(cached["proof"], renaming)
+
+    cache[key] = (memory.generation, cached)
+    cache.move_to_end(key)
+    while len(cache) > maxsize:
+        cache.popitem(last=False)
+
+
+def resize(size):
+    """Changes the maximum number of results kept in the proof cache, discarding the least recently used results if
+    the cache is now over the limit."""
+    global maxsize
+    maxsize = size
+    while len(cache) > maxsize:
+        cache.popitem(last=False)
+
+
+def cache_info():
+    """Returns the hits, misses, maximum size and current size of the proof cache."""
+    return {"hits": hits, "misses": misses, "maxsize": maxsize, "currsize": len(cache)}
+
+
+def clear():
+    """Empties the proof cache and resets its hit and miss counters."""
+    global hits, misses
+    cache.clear()
+    hits = 0
+    misses = 0
@@ -0,0 +1,138 @@
+import argparse
+import json
+import sys
+
+import detachment
+import limits
+import memory
+import store
+import substitution
+import syntax
+import tautology
+import unification
+from expression import Expression
+from theorems import axioms
+
+# Default limits on the saturation: the number of rounds of derivation from the axioms, and the largest number of
+# theorems in the library, including the axioms.
+DEPTH = 2
+MAX_THEOREMS = 5000
+
+STANDARD_CONNECTIVES = ["v", ">"]
+
+
+def substitutions(theorem):
+    """Yields the theorems given by a single substitution into the theorem: the negation of a variable, another of its
+    variables, or a unit of two of its variables joined by a standard connective, in place of each variable. Each is
+    yielded with the keys of the other theorems used to derive it, of which there are none."""
+    tree = syntax.parse(theorem)
+    variables = sorted(tree.variables)
+    for variable in variables:
+        values = [Expression([unification.negate(variable)])]
+        values += [Expression([other]) for other in variables if other != variable]
+        values += [Expression([left, connective, right]) for left in variables for right in variables
+                   for connective in STANDARD_CONNECTIVES]
+        for value in values:
+            # Every other variable is bound to itself, so only one variable is substituted at a time.
+            binding = {name: Expression([name]) for name in variables}
+            binding[variable] = value
+            instance = unification.instantiate(tree, binding)
+            if instance is not None:
+                yield instance, []
+
+
+def replacements(theorem):
+    """Yields the theorems given by the replacement routines of the method of substitution, as for substitutions."""
+    if "v" in theorem:
+        yield substitution.replacement_or(theorem), []
+    if ">" in theorem:
+        yield substitution.replacement_implies(theorem), []
+
+
+def detachments(theorem):
+    """Yields the right side of the theorem, as a standard expression, if its left side is proved by substitution from
+    the theorem memory, with the keys of the theorems which proved the left side. This is the method of detachment
+    applied forwards."""
+    left = detachment.standardise_subexpression(detachment.get_left_subexpression(theorem))
+    right = detachment.standardise_subexpression(detachment.get_right_subexpression(theorem))
+    if ":>:" not in left or ":>:" not in right:
+        return
+    proof, keys = substitution.substitution_proof(left)
+    if proof:
+        yield right, keys
+
+
+def consequences(theorem):
+    """Yields (expression, method, keys of the other theorems used) for each expression derived from the theorem in a
+    single step, by substitution, replacement or detachment."""
+    for method, derive in (("substitution", substitutions), ("replacement", replacements),
+                           ("detachment", detachments)):
+        for expression, keys in derive(theorem):
+            yield expression, method, keys
+
+
+def saturate(depth=DEPTH, max_theorems=MAX_THEOREMS, time_limit=None):
+    """Derives theorems forwards from the theorem memory, in rounds, adding each new theorem to the theorem memory.
+    Each round derives the consequences of the theorems added in the round before, starting from every theorem in the
+    memory. Stops after the given number of rounds, or once the memory holds max_theorems theorems or the time limit in
+    seconds runs out. Returns the keys of the theorems added.
+
+    The replacement routines do not preserve the meaning of every expression they are given, so only the derived
+    expressions which are tautologies are kept. Theorems differing from a stored theorem only by the names of their
+    variables are not stored again (see memory.add_theorem). Each theorem added is recorded in the proof DAG, with the
+    theorem it was derived from as its first parent."""
+    memory.update_indexes()
+    budget = limits.Budget(time_limit)
+    frontier = list(axioms)
+    added = []
+    try:
+        for _ in range(depth):
+            derived = []
+            for key in frontier:
+                for expression, method, keys in consequences(axioms[key]):
+                    if len(axioms) >= max_theorems:
+                        return added
+                    budget.spend()
+                    if syntax.parse(expression).op != ":>:" or not tautology.is_tautology(expression):
+                        continue
+                    last_key = memory.last_key
+                    stored = memory.add_theorem(expression, method, [key] + keys)
+                    if stored is not None and stored > last_key:
+                        derived.append(stored)
+                        added.append(stored)
+            frontier = derived
+    except limits.BudgetExhausted:
+        pass
+    return added
+
+
+def write_library(path):
+    """Writes every theorem in the theorem memory, with its index entry and derivation, to a library at the given path,
+    replacing any theorems already there. The library is a theorem store (see store.py), loaded by
+    memory.load_library."""
+    memory.update_indexes()
+    connection = store.open_store(path)
+    store.replace_theorems(connection, ((key, axioms[key], memory.with_symbols(memory.indexed[key])) for key in sorted(axioms)),
+                           ((key, method, parents) for key, (method, parents) in memory.derivations.items()
+                            if key in axioms))
+    connection.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Derive theorems forwards from the axioms, and write them to a "
+                                                 "library which the prover can load at start up.")
+    parser.add_argument("library", help="path of the library to write")
+    parser.add_argument("--depth", type=int, default=DEPTH, help="rounds of derivation from the axioms")
+    parser.add_argument("--max-theorems", type=int, default=MAX_THEOREMS,
+                        help="largest number of theorems in the library, including the axioms")
+    parser.add_argument("--time-limit", type=float, default=None, help="seconds allowed for the saturation")
+    args = parser.parse_args(argv)
+
+    added = saturate(args.depth, args.max_theorems, args.time_limit)
+    write_library(args.library)
+    sys.stderr.write(json.dumps({"theorems": len(axioms), "derived": len(added),
+                                 "duplicates": memory.duplicate_report()["rejected"]}) + "\n")
+
+
+if __name__ == "__main__":
+    main()
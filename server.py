@@ -0,0 +1,200 @@
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+
+import batch
+import memory
+import parallel
+from theorems import axioms
+
+# Largest number of proofs which may be waiting for or running in the worker pool at once. Once it is reached, the
+# server stops reading requests from its connections until a proof finishes, so that clients sending faster than the
+# pool can prove are slowed down by TCP flow control rather than queued in memory without limit.
+MAX_PENDING = 64
+
+# Number of theorems added to the theorem memory after which the worker pool is restarted, so that the workers prove
+# against a recent snapshot of the theorem memory.
+REFRESH_AFTER = 64
+
+
+class ProverService:
+    """Proves expressions sent by clients over a pool of worker processes. Each worker proves against a snapshot of the
+    theorem memory (see parallel.init_worker), and proved expressions are added to the theorem memory of the server.
+    Concurrent requests for the same expression share a single proof."""
+
+    def __init__(self, processes=None, max_pending=MAX_PENDING, refresh_after=REFRESH_AFTER, store=True,
+                 time_limit=None, max_steps=None):
+        self.processes = processes or os.cpu_count()
+        # Every proof is limited to the same time and steps, so coalesced requests can share a result.
+        self.task = partial(parallel.prove_task, time_limit=time_limit, max_steps=max_steps)
+        self.refresh_after = refresh_after
+        self.store = store
+        self.pending = asyncio.Semaphore(max_pending)
+        # Maps the text of each expression being proved to the future of its result.
+        self.in_flight = {}
+        self.coalesced = 0
+        self.added = 0
+        self.pool = None
+        self.start_pool()
+
+    def start_pool(self):
+        """Starts a new worker pool with a snapshot of the current theorem memory. Proofs already sent to the previous
+        pool are left to finish in it."""
+        memory.update_indexes()
+        previous = self.pool
+        # Workers are spawned rather than forked, as a forked worker would inherit the sockets of the connections open
+        # when it was started, and keep them open after the server has closed them.
+        self.pool = ProcessPoolExecutor(self.processes, multiprocessing.get_context("spawn"),
+                                        initializer=parallel.init_worker, initargs=(dict(axioms),))
+        self.added = 0
+        if previous is not None:
+            previous.shutdown(wait=False)
+
+    def close(self):
+        self.pool.shutdown()
+
+    async def prove(self, expression):
+        """Returns the result of proving the expression, as written by batch.prove but without an id. If the same
+        expression is already being proved, waits for that proof instead of starting another."""
+        text = str(expression)
+        future = self.in_flight.get(text)
+        if future is not None:
+            self.coalesced += 1
+            return dict(await asyncio.shield(future))
+
+        future = asyncio.get_running_loop().create_future()
+        self.in_flight[text] = future
+        pool = self.pool
+        try:
+            record = await asyncio.get_running_loop().run_in_executor(pool, self.task, (None, expression))
+            del record["id"]
+            last_key = memory.last_key
+            record = parallel.merge_result(record, store=self.store)
+            if memory.last_key != last_key:
+                self.added += 1
+            future.set_result(record)
+        except Exception as error:
+            # Marks the exception as retrieved, as there may be no coalesced requests waiting for it.
+            future.set_exception(error)
+            future.exception()
+            # A worker which has died cannot be replaced within its pool, so a new pool is started in its place.
+            if isinstance(error, BrokenProcessPool) and pool is self.pool:
+                self.start_pool()
+            raise
+        finally:
+            del self.in_flight[text]
+
+        if self.added >= self.refresh_after:
+            self.start_pool()
+        return dict(record)
+
+    def theorems(self):
+        """Returns the theorem memory, as a dictionary of key to expression text."""
+        memory.update_indexes()
+        return {key: str(theorem) for key, theorem in axioms.items()}
+
+    def status(self):
+        """Returns the size and usage of the theorem memory and the number of proofs in progress and coalesced so
+        far."""
+        return {"theorems": len(axioms), "in_flight": len(self.in_flight), "coalesced": self.coalesced,
+                "memory": memory.usage_report()}
+
+    async def respond(self, request, writer):
+        """Answers a single request, writing the response as a line of JSON."""
+        try:
+            op = request.get("op", "prove")
+            if op == "prove":
+                _, expression = batch.parse_record(request)
+                response = await self.prove(expression)
+            elif op == "theorems":
+                response = {"theorems": self.theorems()}
+            elif op == "status":
+                response = self.status()
+            else:
+                response = {"error": f"Unknown operation {op!r}."}
+        except Exception as error:
+            response = {"error": f"{type(error).__name__}: {error}"}
+        finally:
+            self.pending.release()
+
+        response["id"] = request.get("id")
+        writer.write((json.dumps(response) + "\n").encode())
+        await writer.drain()
+
+    async def handle(self, reader, writer):
+        """Serves a single connection. Each line is a request, written as a JSON object with an "op" of "prove" (the
+        default, with an "expression" as in batch input), "theorems" or "status", and optionally an "id" which is
+        copied to the response. Requests are answered as they finish, so responses may be out of order."""
+        tasks = set()
+        try:
+            while True:
+                await self.pending.acquire()
+                line = await reader.readline()
+                if not line:
+                    self.pending.release()
+                    break
+                try:
+                    request = json.loads(line)
+                except ValueError:
+                    request = None
+                if not isinstance(request, dict):
+                    request = {"op": None}
+                task = asyncio.create_task(self.respond(request, writer))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+        finally:
+            writer.close()
+
+
+async def serve(host="127.0.0.1", port=8765, processes=None, max_pending=MAX_PENDING, store=True, time_limit=None,
+                max_steps=None):
+    """Runs the prover service until cancelled."""
+    service = ProverService(processes, max_pending, store=store, time_limit=time_limit, max_steps=max_steps)
+    server = await asyncio.start_server(service.handle, host, port)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the prover on a local TCP port. Each request and response is a "
+                                                 "line of JSON.")
+    parser.add_argument("--host", default="127.0.0.1", help="address to listen on (default: localhost only)")
+    parser.add_argument("--port", type=int, default=8765, help="port to listen on")
+    parser.add_argument("-p", "--processes", type=int, default=None, help="number of worker processes")
+    parser.add_argument("--max-pending", type=int, default=MAX_PENDING,
+                        help="proofs waiting or running at once before the server stops reading requests")
+    parser.add_argument("--no-store", action="store_true",
+                        help="do not add proved expressions to the theorem memory")
+    parser.add_argument("--time-limit", type=float, default=None, help="seconds allowed to prove each expression")
+    parser.add_argument("--max-steps", type=int, default=None, help="steps allowed to prove each expression")
+    parser.add_argument("--theorem-store", help="persistent theorem store to load and save the theorem memory to")
+    parser.add_argument("--capacity", type=int, default=None,
+                        help="largest number of theorems kept in the theorem memory, evicting the least used")
+    parser.add_argument("--library", help="library of derived theorems written by saturate.py, to load at start up")
+    args = parser.parse_args(argv)
+
+    if args.theorem_store:
+        memory.attach(args.theorem_store)
+    if args.library:
+        memory.load_library(args.library)
+    memory.set_capacity(args.capacity)
+
+    try:
+        asyncio.run(serve(args.host, args.port, args.processes, args.max_pending, store=not args.no_store,
+                          time_limit=args.time_limit, max_steps=args.max_steps))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
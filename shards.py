@@ -0,0 +1,155 @@
+import multiprocessing
+import os
+from multiprocessing.connection import wait
+
+import unification
+
+# Number of pattern symbols, from the start of each theorem's path through a discrimination tree, which decide the
+# shard holding it. A query can only reach theorems whose paths begin with one of at most 2**PREFIX_DEPTH prefixes
+# (see unification.prefixes), so it is only sent to the shards holding those prefixes.
+PREFIX_DEPTH = 8
+
+# Names of the discrimination trees of the theorem memory held by the shards (see memory.discrimination_tree and
+# memory.left_discrimination_tree).
+TREES = ("whole", "left")
+
+
+def split(symbols, depth=PREFIX_DEPTH):
+    """Splits the pattern symbols of a theorem into the prefix deciding its shard, and the rest of the symbols."""
+    return tuple(symbols[:depth]), symbols[depth:]
+
+
+def run_shard(connection):
+    """Runs in a shard process, holding its part of each discrimination tree and answering the router's messages until
+    told to stop. Each part is a trie for each prefix held by the shard, over the symbols following the prefix. Each
+    message is a tuple of an operation and its arguments."""
+    tries = {name: {} for name in TREES}
+    sizes = dict.fromkeys(TREES, 0)
+    while True:
+        # The router has gone if its end of the pipe is closed, as when the parent process exits without closing it.
+        try:
+            op, *arguments = connection.recv()
+        except EOFError:
+            return
+        if op == "insert":
+            for name, prefix, rest, value in arguments[0]:
+                unification.insert(tries[name].setdefault(prefix, {}), rest, value)
+                sizes[name] += 1
+        elif op == "remove":
+            for name, prefix, rest, value in arguments[0]:
+                trie = tries[name][prefix]
+                unification.remove(trie, rest, value)
+                if not trie:
+                    del tries[name][prefix]
+                sizes[name] -= 1
+        elif op == "search":
+            name, starts, nodes = arguments
+            trie = tries[name]
+            connection.send(unification.search([(trie[prefix], position) for prefix, position in starts
+                                                if prefix in trie], nodes))
+        elif op == "size":
+            connection.send({name: {"entries": sizes[name], "prefixes": len(tries[name])} for name in TREES})
+        elif op == "clear":
+            for name in TREES:
+                tries[name].clear()
+                sizes[name] = 0
+        elif op == "stop":
+            connection.close()
+            return
+
+
+class ShardRouter:
+    """Partitions the discrimination trees of the theorem memory between a number of shard processes, keyed by the
+    first PREFIX_DEPTH symbols of each theorem's path through the tree. A query is only sent to the shards holding the
+    prefixes it could match, and is sent to each of them at once, so the shards search their parts in parallel and the
+    results are merged here. See memory.attach_shards."""
+
+    def __init__(self, count, depth=PREFIX_DEPTH):
+        # The shard processes are spawned rather than forked, so they do not hold copies of the parent's theorem
+        # memory, or of any sockets it has open.
+        context = multiprocessing.get_context("spawn")
+        self.owner = os.getpid()
+        self.count = count
+        self.depth = depth
+        self.connections = []
+        self.processes = []
+        for _ in range(count):
+            connection, child = context.Pipe()
+            process = context.Process(target=run_shard, args=(child,), daemon=True)
+            process.start()
+            child.close()
+            self.connections.append(connection)
+            self.processes.append(process)
+
+    def check_owner(self):
+        """Raises RuntimeError in a forked child of the process which started the shards (such as a portfolio race),
+        as messages sent from two processes over the same pipes would be interleaved."""
+        if os.getpid() != self.owner:
+            raise RuntimeError("The shards can only be used by the process which started them.")
+
+    def shard_of(self, prefix):
+        """Returns the number of the shard holding the theorems whose paths begin with the prefix. The prefix is only
+        hashed in this process, so it need not hash the same in the shards."""
+        return hash(prefix) % self.count
+
+    def send(self, op, entries):
+        """Sends (tree name, pattern symbols, value) entries to the shards holding their prefixes, with one message to
+        each shard."""
+        self.check_owner()
+        batches = {}
+        for name, symbols, value in entries:
+            prefix, rest = split(symbols, self.depth)
+            batches.setdefault(self.shard_of(prefix), []).append((name, prefix, rest, value))
+        for shard, batch in batches.items():
+            self.connections[shard].send((op, batch))
+
+    def insert(self, entries):
+        """Inserts each (tree name, pattern symbols, value) entry into the discrimination tree of its shard."""
+        self.send("insert", entries)
+
+    def remove(self, entries):
+        """Removes each (tree name, pattern symbols, value) entry from the discrimination tree of its shard."""
+        self.send("remove", entries)
+
+    def retrieve(self, name, tree):
+        """Returns the values stored in the named discrimination tree for every theorem that the expression with the
+        given syntax tree could be an instance of, as unification.retrieve, searching the shards at once."""
+        self.check_owner()
+        nodes = unification.target_symbols(tree)
+        asked = {}
+        for prefix, position in unification.prefixes(nodes, self.depth):
+            asked.setdefault(self.shard_of(prefix), []).append((prefix, position))
+        for shard, starts in asked.items():
+            self.connections[shard].send(("search", name, starts, nodes))
+
+        found = []
+        waiting = [self.connections[shard] for shard in asked]
+        while waiting:
+            for connection in wait(waiting):
+                found.extend(connection.recv())
+                waiting.remove(connection)
+        return found
+
+    def sizes(self):
+        """Returns the number of entries and of prefixes of each discrimination tree held by each shard."""
+        self.check_owner()
+        for connection in self.connections:
+            connection.send(("size",))
+        return [connection.recv() for connection in self.connections]
+
+    def clear(self):
+        """Empties every shard."""
+        self.check_owner()
+        for connection in self.connections:
+            connection.send(("clear",))
+
+    def close(self):
+        """Stops the shard processes."""
+        for connection in self.connections:
+            try:
+                connection.send(("stop",))
+            except (BrokenPipeError, OSError):
+                pass
+            connection.close()
+        for process in self.processes:
+            process.join()
@@ -0,0 +1,145 @@
+import json
+import sqlite3
+
+# Each theorem is stored with its index entry (see memory.theorem_entry), so that when the store is loaded the theorem
+# memory can be indexed without parsing or describing any of the stored theorems again. Descriptions are written as
+# "NK,NJ,NH", and the discrimination tree symbols as JSON. The derivation of each derived theorem in the proof DAG (see
+# memory.derivations) is stored in its own table, with the keys of its parent theorems as JSON.
+#
+# The usage table records how useful each theorem has been (see memory.uses), and whether it has been evicted to the
+# cold tier, so a bounded theorem memory is restored as it was left. A theorem with no row has no recorded uses.
+#
+# The functions writing single theorems and derivations do not commit, so a caller making many changes commits them
+# together (see memory.flush).
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS theorems (
+    key INTEGER PRIMARY KEY,
+    expression TEXT NOT NULL,
+    dl TEXT NOT NULL,
+    dr TEXT NOT NULL,
+    d TEXT NOT NULL,
+    sub_dl TEXT,
+    sub_dr TEXT,
+    patterns TEXT NOT NULL,
+    left_symbols TEXT NOT NULL,
+    canonical TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS theorems_dl ON theorems (dl);
+CREATE TABLE IF NOT EXISTS derivations (
+    key INTEGER PRIMARY KEY,
+    method TEXT NOT NULL,
+    parents TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS usage (
+    key INTEGER PRIMARY KEY,
+    uses INTEGER NOT NULL,
+    cold INTEGER NOT NULL
+);
+"""
+
+
+def open_store(path):
+    """Opens (creating if necessary) the theorem store at the given path."""
+    connection = sqlite3.connect(path)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    connection.executescript(SCHEMA)
+    return connection
+
+
+def encode_description(d):
+    """Writes a description tuple as text."""
+    return ",".join(str(n) for n in d)
+
+
+def decode_description(text):
+    """Reads a description tuple written by encode_description."""
+    return tuple(int(n) for n in text.split(","))
+
+
+def encode_row(key, theorem, entry):
+    """Writes a theorem and its index entry as a row of the theorems table."""
+    dl, dr, d, sub, patterns, left_symbols, canonical_form = entry
+    return (key, str(theorem), encode_description(dl), encode_description(dr), encode_description(d),
+            encode_description(sub[0]) if sub else None, encode_description(sub[1]) if sub else None,
+            json.dumps([[symbols, str(form)] for symbols, form in patterns]), json.dumps(left_symbols),
+            str(canonical_form))
+
+
+def save_theorem(connection, key, theorem, entry):
+    """Writes a theorem and its index entry to the store, without committing."""
+    connection.execute("INSERT OR REPLACE INTO theorems VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                       encode_row(key, theorem, entry))
+
+
+def replace_theorems(connection, theorems, derivations=()):
+    """Replaces the contents of the store with the given (key, theorem, index entry) triples and (key, method, parent
+    keys) derivations, in a single transaction."""
+    with connection:
+        connection.execute("DELETE FROM theorems")
+        connection.execute("DELETE FROM derivations")
+        connection.execute("DELETE FROM usage")
+        connection.executemany("INSERT INTO theorems VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                               (encode_row(key, theorem, entry) for key, theorem, entry in theorems))
+        connection.executemany("INSERT INTO derivations VALUES (?, ?, ?)",
+                               ((key, method, json.dumps(parents)) for key, method, parents in derivations))
+
+
+def save_derivation(connection, key, method, parents):
+    """Writes the derivation of a theorem to the store, without committing."""
+    connection.execute("INSERT OR REPLACE INTO derivations VALUES (?, ?, ?)", (key, method, json.dumps(parents)))
+
+
+def save_usage(connection, rows):
+    """Writes (key, uses, cold) for each of the given theorems to the store, without committing."""
+    connection.executemany("INSERT OR REPLACE INTO usage VALUES (?, ?, ?)", rows)
+
+
+def load_usage(connection):
+    """Returns the number of uses recorded for each theorem with a row in the usage table, keyed on theorem key."""
+    return dict(connection.execute("SELECT key, uses FROM usage"))
+
+
+def load_cold(connection):
+    """Streams (key, canonical form text) for each stored theorem in the cold tier."""
+    yield from connection.execute("SELECT theorems.key, canonical FROM theorems JOIN usage ON theorems.key = usage.key "
+                                  "WHERE cold ORDER BY theorems.key")
+
+
+def load_derivations(connection):
+    """Streams (key, method, parent keys) for each stored derivation."""
+    for key, method, parents in connection.execute("SELECT key, method, parents FROM derivations"):
+        yield key, method, tuple(json.loads(parents))
+
+
+def delete_theorem(connection, key):
+    """Removes a theorem, its derivation and its usage from the store, without committing."""
+    connection.execute("DELETE FROM theorems WHERE key = ?", (key,))
+    connection.execute("DELETE FROM derivations WHERE key = ?", (key,))
+    connection.execute("DELETE FROM usage WHERE key = ?", (key,))
+
+
+def decode_entry(row):
+    """Reads the index entry of a theorem from the columns of its row following the expression."""
+    dl, dr, d, sub_dl, sub_dr, patterns, left_symbols, canonical_form = row
+    sub = (decode_description(sub_dl), decode_description(sub_dr)) if sub_dl is not None else None
+    return (decode_description(dl), decode_description(dr), decode_description(d), sub, json.loads(patterns),
+            json.loads(left_symbols), canonical_form)
+
+
+def load_theorem(connection, key):
+    """Returns (expression text, index entry) for a single stored theorem, as in load_theorems."""
+    row = connection.execute("SELECT expression, dl, dr, d, sub_dl, sub_dr, patterns, left_symbols, canonical "
+                             "FROM theorems WHERE key = ?", (key,)).fetchone()
+    if row is None:
+        raise KeyError(f"Theorem {key} is not in the store.")
+    return row[0], decode_entry(row[1:])
+
+
+def load_theorems(connection):
+    """Streams (key, expression text, index entry) for each stored theorem outside the cold tier, in order of key. The
+    forms and canonical form in the index entry are left as text, to be converted to Expressions by the caller."""
+    rows = connection.execute("SELECT key, expression, dl, dr, d, sub_dl, sub_dr, patterns, left_symbols, canonical "
+                              "FROM theorems WHERE key NOT IN (SELECT key FROM usage WHERE cold) ORDER BY key")
+    for row in rows:
+        yield row[0], row[1], decode_entry(row[2:])
@@ -1,8 +1,20 @@
-from itertools import groupby
-from theorems import axioms
+from functools import lru_cache
+from expression import Expression, as_expression
+import syntax
+import unification
+import memory
+import instrumentation
+import limits
 
 CONNECTIVES = ["v", ".v.", ">", ".>.", ":>:"]
 
+# Connectives which end a unit, so the token following one of them starts a new unit.
+UNIT_BOUNDARIES = {".v.", ".>.", ":>:"}
+
+# Maximum number of expression descriptions kept in the description cache. The least recently used description is
+# discarded once the cache is full.
+DESCRIPTION_CACHE_SIZE = 8192
+
 # Method of Substitution (MSb)
 # # SIMILARITY TEST - CSm
 # # # EXPRESSION DESCRIPTION - CSm(D)
@@ -11,18 +23,8 @@ CONNECTIVES = ["v", ".v.", ">", ".>.", ":>:"]
 def count_levels(expression):
     """Counts the total number of levels in the expression."""
 
-    # Function returns the criteria for splitting the expression into each 'level'.
-    def split_conditions(x):
-        return x in CONNECTIVES
-
-    # Divides list into groups based on the criteria returned from split_conditions function.
-    group = groupby(expression, key=split_conditions)
-
-    # Each list is stored in a dictionary.
-    result = dict(enumerate((list(j) for i, j in group if not i)))
-
-    # The length of the dictionary is returned to count the number of levels in the expression.
-    nk = len(result)
+    # The syntax tree counts the levels of each subtree as it is built, so the count is read from the root.
+    nk = syntax.parse(expression).description[0]
     return nk
 
 
@@ -53,13 +55,12 @@ def count_distinct(expression):
 def count_variables(expression):
     """Counts the total number of variables in the expression."""
 
-    # All connectives are removed from the list, leaving just the variables.
-    for i in expression:
-        if i in CONNECTIVES:
-            expression.remove(i)
+    # All connectives are filtered out of the list, leaving just the variables. A new list is built so the expression
+    # passed in is left unchanged.
+    variables = [i for i in expression if i not in CONNECTIVES]
 
-    # Length of the updated list is returned to show the total number of variables in the expression.
-    nh = len(expression)
+    # Length of the filtered list is returned to show the total number of variables in the expression.
+    nh = len(variables)
     return nh
 
 
@@ -72,236 +73,147 @@ def cancel_negative(n):
     return n
 
 
-def description(expression):
-    """Returns description of the expression based on NK, NJ, NH."""
-    levels = count_levels(expression)
-    distinct = count_distinct(expression)
-    variables = count_variables(expression)
+def calculate_description(expression):
+    """Calculates NK, NJ and NH for the expression in a single pass, rather than one pass for each count."""
+    levels = 0
+    variables = 0
+    distinct = set()
+
+    # A new level starts at each variable which directly follows a connective (or starts the expression).
+    in_level = False
+    for n in expression:
+        if n in CONNECTIVES:
+            in_level = False
+        else:
+            if not in_level:
+                levels += 1
+                in_level = True
+            variables += 1
+            distinct.add(cancel_negative(n))
 
     # Returns the description of the expression as a tuple.
-    d = (levels, distinct, variables)
+    d = (levels, len(distinct), variables)
     return d
 
 
-def description_left(expression):
-    """Description of the left side of the expression in terms of NK, NJ and NH."""
-
-    # Function used to set the criteria for splitting the expression into two sides.
-    def split_conditions(x):
-        return x in {":>:"}
+@lru_cache(maxsize=DESCRIPTION_CACHE_SIZE)
+def cached_description(expression):
+    """Description cache. The expression must be passed as an Expression, so it can be used as the key of the cache."""
+    return calculate_description(expression)
 
-    # Two sides of the expression is placed into a dictionary.
-    group = groupby(expression, key=split_conditions)
-    result = dict(enumerate((list(j) for i, j in group if not i)))
-
-    # Description of expression returned as a tuple.
-    dl = description(result[0])
-    return dl
 
+def description(expression):
+    """Returns description of the expression based on NK, NJ, NH."""
+    d = cached_description(as_expression(expression))
+    return d
 
-def description_right(expression):
-    """Description of the right side of the expression using NK, NJ and NH."""
-
-    # Function used to set the criteria for splitting the expression into two sides.
-    def split_conditions(x):
-        return x in {":>:"}
-
-    group = groupby(expression, key=split_conditions)
-    result = dict(enumerate((list(j) for i, j in group if not i)))
-
-    # Description of expression returned as a tuple.
-    dr = description(result[1])
-    return dr
-
-
-# # # DESCRIPTION COMPARISON - CSm(CD)
-
-def compare_left_descriptions(expression):
-    """Compares the left-hand side of the expression to be proved to the left-hand side of the axioms"""
-    dl = description_left(expression)
-
-    # List created to record which axioms/theorems match the DL for the expression.
-    matches = []
-
-    # Iterates through each axiom, if the DL of the expression matches that of the axiom, axiom is added to list.
-    # Continue keyword used to allow function to continue searching after a match has already been found.
-    for n in axioms:
-        if dl == description_left(axioms[n]):
-            matches.append(n)
-        continue
-
-    return matches
 
+def description_cache_info():
+    """Returns the hits, misses, maximum size and current size of the description cache."""
+    return cached_description.cache_info()
 
-def compare_right_descriptions(expression):
-    """Compares the left-hand side of the expression to be proved to the left-hand side of the axioms"""
-    dr = description_right(expression)
 
-    # List created to record which axioms/theorems match the DR for the expression.
-    matches = []
+def clear_description_cache():
+    """Empties the description cache and resets its hit and miss counters."""
+    cached_description.cache_clear()
 
-    # Iterates through each axiom, if the DR of the expression matches that of the axiom, axiom is added to list.
-    # Continue keyword used to allow function to continue searching after a match has already been found.
-    for n in axioms:
-        if dr == description_right(axioms[n]):
-            matches.append(n)
-        continue
 
-    return matches
+def description_left(expression):
+    """Description of the left side of the expression in terms of NK, NJ and NH."""
 
+    # The description of the left subtree of the main connective is calculated when the syntax tree is built.
+    dl = syntax.parse(expression).main_left.description
+    return dl
 
-def test_similarity(expression):
-    """Test for similarity between expression to be proved and saved theorems. Returns list of any matches"""
 
-    # Calls the left and right side comparisons and checks if there are any axioms that have matching descriptions on
-    # both sides. returns the key for the axiom if one is found, or false if not.
-    left = compare_left_descriptions(expression)
-    right = compare_right_descriptions(expression)
-    matches = set(left).intersection(right)
-    match_list = list(matches)
+def description_right(expression):
+    """Description of the right side of the expression using NK, NJ and NH."""
 
-    # Checks that at least one axiom was matched to the expression.
-    if len(matches) > 0:
-        return match_list
-    else:
-        return False
+    # The description of the right subtree of the main connective is calculated when the syntax tree is built.
+    dr = syntax.parse(expression).main_right.description
+    return dr
 
 
 # # MATCHING ROUTINE
 
 
-def enumerate_expression(expression):
-    """Converts expression list into an enumerated dictionary, to allow iteration through expression using the index."""
-    enumerated_dict = {}
-    for index, variable in enumerate(expression):
-        enumerated_dict[index] = variable
-    return enumerated_dict
-
-
 def replacement_or(expression):
     """Replaces the connective v with the connective >. The variable before the connective is made negative.
-    I.e: '-p v q' becomes 'p > q'. """
-    enumerated_expression = enumerate_expression(expression)
-    replaced_expression = []
-    for i in enumerated_expression:
-        if enumerated_expression[i] == "v":
-            enumerated_expression[i] = ">"
-            if not enumerated_expression[i - 1].startswith("-"):
-                enumerated_expression[i - 1] = f"-{enumerated_expression[i - 1]}"
+    I.e: '-p v q' becomes 'p > q'. The result only means the same as the expression if replaceable_or allows it."""
+    # The tokens are copied once into the list that becomes the replaced expression, and updated in place.
+    replaced_expression = list(expression)
+    for i, token in enumerate(replaced_expression):
+        if token == "v":
+            replaced_expression[i] = ">"
+            if not replaced_expression[i - 1].startswith("-"):
+                replaced_expression[i - 1] = f"-{replaced_expression[i - 1]}"
             else:
-                enumerated_expression[i - 1] = enumerated_expression[i - 1].lstrip("-")
+                replaced_expression[i - 1] = replaced_expression[i - 1].lstrip("-")
 
-    for i in enumerated_expression:
-        replaced_expression.append(enumerated_expression[i])
-    return replaced_expression
+    return Expression(replaced_expression)
+
+
+def replaceable_or(expression):
+    """Checks that replacement_or keeps the meaning of the expression. Only the token before each 'v' is negated, so
+    the left operand of every 'v' must be a single variable: the first token of its unit, as 'v' and '>' group to the
+    left. I.e. '-p v q' can be replaced, but not 'p > q v p', which is '(p > q) v p'."""
+    expression = as_expression(expression)
+    for i, token in enumerate(expression):
+        if token == "v" and i >= 2 and expression[i - 2] not in UNIT_BOUNDARIES:
+            return False
+    return True
 
 
 def replacement_implies(expression):
     """Replaces the connective > with the connective v. The variable before the connective is made negative.
     I.e: 'p > q' becomes '-p v q'."""
-    enumerated_expression = enumerate_expression(expression)
-    replaced_expression = []
-    for i in enumerated_expression:
-        if enumerated_expression[i] == "v":
-            enumerated_expression[i] = ">"
-            if not enumerated_expression[i - 1].startswith("-"):
-                enumerated_expression[i - 1] = f"-{enumerated_expression[i - 1]}"
+    replaced_expression = list(expression)
+    for i, token in enumerate(replaced_expression):
+        if token == "v":
+            replaced_expression[i] = ">"
+            if not replaced_expression[i - 1].startswith("-"):
+                replaced_expression[i - 1] = f"-{replaced_expression[i - 1]}"
             else:
-                enumerated_expression[i - 1] = enumerated_expression[i - 1].lstrip("-")
-    for i in enumerated_expression:
-        replaced_expression.append(enumerated_expression[i])
-    return replaced_expression
-
-
-def matching(expression, axiom):
-    """Matching routine. Made up of the substitute function and the replacement function. First the replacement method
-    is used to match the connectives in the axiom and expression, if not already the same. Then the substitute method
-    is called to match any non-identical variables. """
-
-    enumerated_axiom = enumerate_expression(axiom)
-    for i in enumerated_axiom:
-        if enumerated_axiom[i] == "v" and "v" not in expression:
-            axiom = replacement_or(axiom)
-
-        elif enumerated_axiom[i] == ">" and ">" not in expression:
-            axiom = replacement_implies(axiom)
-
-    axiom = substitute(expression, axiom)
-
-    return axiom
-
-
-def substitute(expression, axiom):
-    """Function substitutes all occurrences of a variable for another variable. I.e., any instances of p will be
-    subbed for q. """
-
-    # Axiom and expression are enumerated to allow iteration through each list.
-    enumerated_expression = enumerate_expression(expression)
-    enumerated_axiom = enumerate_expression(axiom)
-
-    # New list created for the matched axiom, and empty dictionary created to act as a key for substituted variables.
-    matched_axiom = []
-    subbed_variables_key = {}
-
-    # Axiom is iterated through to check if the variables in the axiom match those in the expression. If they do not
-    # match, the variable must be substituted. This list stores the variable that has been substituted as the key and
-    # the variable that it is being substituted for as the value.
-    for i in enumerated_axiom:
-        if enumerated_axiom[i] not in CONNECTIVES and enumerated_axiom[i] != enumerated_expression[i]:
-            subbed_variables_key[enumerated_axiom[i]] = enumerated_expression[i]
-
-    # The enumerated axiom is looped through, to check: 1) if the variable is a connective (if so, it is added to the
-    # matched axiom list unchanged). 2) if the axiom variable is different to that of the expression (if so,
-    # the matched axiom is appended with the value linked to the key of the variable).
-    # If the variable in the axiom is the same as that in the expression, it is added unchanged to the matched axiom.
-    for i in enumerated_axiom:
-        if enumerated_axiom[i] in CONNECTIVES:
-            matched_axiom.append(enumerated_axiom[i])
-
-        elif enumerated_axiom[i] != enumerated_expression[i]:
-            matched_axiom.append(subbed_variables_key[enumerated_axiom[i]])
-
-        else:
-            matched_axiom.append(enumerated_expression[i])
-
-    # The substituted axiom is returned after the substitutions have been made. I.e. any instances of p have been
-    # changed to q if the expression has q where the axiom has a p.
-    return matched_axiom
-
-
-def report_identical(expression, axiom):
-    """Reports successful termination of matching routine, or reports failure if expression and axiom cannot be
-    matched. """
-    if expression == axiom:
-        return True
-    elif not axiom:
-        return False
-    else:
-        return False
+                replaced_expression[i - 1] = replaced_expression[i - 1].lstrip("-")
+
+    return Expression(replaced_expression)
+
+
+def substitution_proof(expression, budget=None):
+    """Method of substitution is made up of the similarity check and the matching routine. The similarity check
+    retrieves the axioms that the expression could be an instance of from the discrimination tree of the theorem
+    memory, and the matching routine unifies each of them with the expression in turn. Returns the proof, and the keys
+    of the axioms used in the proof. Each axiom tried is a step of the budget, if one is given."""
+    if budget is None:
+        budget = limits.Budget()
+    tree = syntax.parse(expression)
+    candidates = memory.unifiable(tree)
+    instrumentation.count("substitution", "candidates", len(candidates))
+    if not candidates:
+        if instrumentation.tracing:
+            instrumentation.event("substitution.no_candidates", expression=expression)
+        return False, None
+
+    if instrumentation.tracing:
+        instrumentation.event("substitution.candidates", expression=expression,
+                              axioms=sorted(set(key for key, axiom in candidates)))
+
+    # Each candidate is either a stored axiom, or the axiom with 'v' replaced by '>' using the replacement routine.
+    # Variables of the axiom are bound to whole sub-expressions of the expression, consistently across the axiom.
+    for key, axiom in candidates:
+        budget.spend()
+        binding = unification.match(syntax.parse(axiom), tree)
+        if binding is not None:
+            if instrumentation.tracing:
+                instrumentation.event("substitution.matched", axiom=key, form=axiom, expression=expression)
+            return as_expression(expression), [key]
+
+    if instrumentation.tracing:
+        instrumentation.event("substitution.unmatched", expression=expression)
+    return False, None
 
 
 def method_of_substitution(expression):
     """Method of substitution is made up of the similarity check and the matching routine"""
-    similar_axioms = test_similarity(expression)
-    if not similar_axioms:
-        print("There are no axioms with identical left and right sides to the expression.")
-        return False
-    else:
-        print(f"Axiom(s) {similar_axioms} have identical left and right descriptions to the expression.")
-        axiom_key = sorted(test_similarity(expression))
-        if axiom_key:
-            axiom = axioms[axiom_key[0]]
-            print(f"Axiom {axiom_key[0]}    : ! {axiom}")
-            print(f"Expression : ? {expression}")
-            axiom = matching(expression, axiom)
-
-        else:
-            axiom = False
-
-    identical = report_identical(expression, axiom)
-    if identical:
-        print(f"Expression has been matched to axiom {axiom_key[0]}.")
-        return axiom
-    else:
-        print("Expression could not be matched.")
-        return False
+    proof = substitution_proof(expression)[0]
+    return proof
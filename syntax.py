@@ -0,0 +1,201 @@
+import weakref
+from array import array
+
+from expression import Expression, as_expression, intern_token
+
+# Precedence of each connective. The main connective ':>:' binds least tightly, followed by the unit connectives
+# '.v.' and '.>.', with the standard connectives 'v' and '>' binding most tightly.
+PRECEDENCE = {":>:": 3, ".v.": 2, ".>.": 2, "v": 1, ">": 1}
+
+# Precedence keyed by interned token id, allowing the parser to scan the token ids of an expression directly.
+PRECEDENCE_IDS = {intern_token(connective): precedence for connective, precedence in PRECEDENCE.items()}
+
+# Hash-consing table of the nodes of every syntax tree in use. Each distinct sub-formula has a single node, shared by
+# every tree it occurs in, so a theorem memory holding thousands of theorems built from the same few sub-formulas holds
+# each of them once. Leaves are keyed on the token ids they cover, and connective nodes on the connective and the nodes
+# of their subtrees. A node is dropped from the table once no tree uses it.
+nodes = weakref.WeakValueDictionary()
+
+
+class Node:
+    """Node of the syntax tree of an expression. Connective nodes have the connective as op and a left and right
+    subtree, while leaf nodes (a variable, or a run of tokens with no connective between them) have no op. The
+    description of each node is calculated when the node is created, so it can be read without re-splitting the
+    expression.
+
+    Nodes are hash-consed (see nodes), so a node does not belong to any one expression, and two nodes are the same
+    object exactly when they cover the same tokens. Nodes must be created with leaf and connect, and never changed."""
+
+    __slots__ = ("op", "left", "right", "variables", "description", "_expression", "_units", "__weakref__")
+
+    def __init__(self, op, left, right, variables, description, expression=None):
+        self.op = op
+        self.left = left
+        self.right = right
+        self.variables = variables
+        self.description = description
+        self._expression = expression
+        self._units = None
+
+    @property
+    def expression(self):
+        """The tokens covered by this node, as an Expression. Kept once built, for connective nodes."""
+        if self._expression is None:
+            # The tokens are read in order from the nodes whose expressions are not yet built, rather than by building
+            # the expression of each subtree in turn, so a tree of any depth is written without recursion.
+            ids = array("I")
+            stack = [self]
+            while stack:
+                node = stack.pop()
+                if isinstance(node, str):
+                    ids.append(intern_token(node))
+                elif node._expression is not None:
+                    ids.extend(node._expression.ids)
+                else:
+                    stack.append(node.right)
+                    stack.append(node.op)
+                    stack.append(node.left)
+            self._expression = Expression.from_ids(ids)
+        return self._expression
+
+    @property
+    def token(self):
+        """The token of a leaf which is a single variable, or None for any other node."""
+        if self.op is None and len(self._expression) == 1:
+            return self._expression[0]
+        return None
+
+    @property
+    def units(self):
+        """The units of the expression covered by this node, in order. A unit is the largest subtree which is not split
+        by the main connective or by a '.v.' or '.>.' connective."""
+        if self._units is None:
+            units = []
+            stack = [self]
+            while stack:
+                node = stack.pop()
+                if node.op is not None and PRECEDENCE[node.op] >= 2:
+                    stack.append(node.right)
+                    stack.append(node.left)
+                else:
+                    units.append(node)
+            self._units = units
+        return self._units
+
+    @property
+    def unit_connectives(self):
+        """The connectives between the units of the expression covered by this node, in order, so the i-th connective
+        follows the i-th unit."""
+        # The tree is read in order, with each connective pushed between its subtrees, so it is popped once the whole
+        # left subtree has been read.
+        connectives = []
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, str):
+                connectives.append(node)
+            elif node.op is not None and PRECEDENCE[node.op] >= 2:
+                stack.append(node.right)
+                stack.append(node.op)
+                stack.append(node.left)
+        return connectives
+
+    @property
+    def main_left(self):
+        """The left subtree of the main connective, or the whole tree if there is no main connective."""
+        if self.op == ":>:":
+            return self.left
+        return self
+
+    @property
+    def main_right(self):
+        """The right subtree of the main connective, or the whole tree if there is no main connective."""
+        if self.op == ":>:":
+            return self.right
+        return self
+
+    def __repr__(self):
+        return f"Node({str(self.expression)!r})"
+
+
+def leaf(source, start, end):
+    """Returns the leaf node covering the tokens source[start:end]. As in the description functions, a run of tokens
+    with no connective between them counts as a single level."""
+    ids = source.ids
+    key = ids[start] if end - start == 1 else tuple(ids[start:end])
+    node = nodes.get(key)
+    if node is None:
+        expression = source[start:end]
+        variables = frozenset(token.lstrip("-") for token in expression)
+        node = Node(None, None, None, variables, (1, len(variables), end - start), expression)
+        nodes[key] = node
+    return node
+
+
+def connect(op, left, right):
+    """Returns the connective node joining two subtrees, combining their descriptions."""
+    key = (op, left, right)
+    node = nodes.get(key)
+    if node is None:
+        variables = left.variables | right.variables
+        levels = left.description[0] + right.description[0]
+        size = left.description[2] + right.description[2]
+        node = Node(op, left, right, variables, (levels, len(variables), size))
+        nodes[key] = node
+    return node
+
+
+def build(source, start, end):
+    """Builds the tree for the tokens source[start:end]. The main connective is split first, and associates to the
+    right. Unit connectives are split next and then the standard connectives, both associating to the left."""
+    ids = source.ids
+    # The tree is built with a stack of tasks rather than by recursion, so an expression of any depth can be parsed.
+    # Each task is either a range of tokens to split, or a connective to join the last two subtrees built. The left
+    # range is split first, so its subtree is built before the right subtree.
+    tasks = [(start, end, None)]
+    built = []
+    while tasks:
+        start, end, op = tasks.pop()
+        if op is not None:
+            right = built.pop()
+            left = built.pop()
+            built.append(connect(op, left, right))
+            continue
+
+        if start >= end:
+            raise ValueError(f"Connective is missing an operand in expression: {source}")
+
+        # The connective with the lowest precedence is found in a single pass. The first ':>:' is used, or else the
+        # last connective of the lowest precedence present.
+        split = -1
+        highest = 0
+        for i in range(start, end):
+            precedence = PRECEDENCE_IDS.get(ids[i], 0)
+            if precedence == 3:
+                split = i
+                break
+            if precedence and precedence >= highest:
+                split = i
+                highest = precedence
+
+        if split < 0:
+            built.append(leaf(source, start, end))
+            continue
+
+        tasks.append((start, end, source[split]))
+        tasks.append((split + 1, end, None))
+        tasks.append((start, split, None))
+
+    return built[0]
+
+
+def parse(expression):
+    """Returns the syntax tree of the expression. The tree is built once and kept with the Expression, so later calls
+    for the same expression (such as a stored theorem) return it straight away."""
+    expression = as_expression(expression)
+    return expression.tree
+
+
+def build_tree(expression):
+    """Builds the syntax tree of an Expression. Used by Expression.tree, which keeps the result."""
+    return build(expression, 0, len(expression))
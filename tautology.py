@@ -0,0 +1,166 @@
+import argparse
+import json
+import sys
+from functools import lru_cache
+
+import evaluator
+import syntax
+
+# NumPy is optional. It is only used to check many expressions at once in tautologies, which falls back to checking
+# each expression in turn when NumPy is not installed.
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# Largest number of distinct variables an expression may have for its truth table to be calculated, as the table has
+# 2**n rows. Expressions with more variables are neither accepted nor rejected.
+MAX_VARIABLES = 20
+
+# Largest number of truth values NumPy calculates at once, across all the expressions of one shape, in tautologies.
+NUMPY_CELLS = 1 << 22
+
+# Smallest number of expressions of one shape worth evaluating together with NumPy in tautologies. Smaller groups are
+# quicker to check one at a time with packed ints.
+NUMPY_GROUP = 32
+
+
+def variable_column(i, n):
+    """Returns the truth values of the i-th of n variables over all 2**n assignments, packed into an int. Bit j is the
+    value of the variable in assignment j, which is bit i of j."""
+    column = ((1 << (1 << i)) - 1) << (1 << i)
+    width = 1 << (i + 1)
+    while width < 1 << n:
+        column |= column << width
+        width <<= 1
+    return column
+
+
+@lru_cache(maxsize=MAX_VARIABLES + 1)
+def variable_columns(n):
+    """Returns the columns of each of n variables, as in variable_column, and the mask of the 2**n bits they use."""
+    return [variable_column(i, n) for i in range(n)], (1 << (1 << n)) - 1
+
+
+def truth_table(expression):
+    """Returns the distinct variables of the expression in order of first occurrence, and its truth table packed into
+    an int as in variable_column. Returns None if the expression has too many variables, or a leaf which is not a
+    single variable."""
+    compiled = evaluator.evaluator(expression)
+    if compiled is None or len(compiled[1]) > MAX_VARIABLES:
+        return None
+    program, variables = compiled
+    columns, mask = variable_columns(len(variables))
+    return variables, program(*columns, mask)
+
+
+def counterexample(expression):
+    """Returns an assignment of truth values to the variables of the expression under which it is false, or None if
+    it is a tautology or its truth table cannot be calculated."""
+    table = truth_table(expression)
+    if table is None:
+        return None
+    variables, values = table
+    falsified = ~values & ((1 << (1 << len(variables))) - 1)
+    if not falsified:
+        return None
+    row = (falsified & -falsified).bit_length() - 1
+    return {name: bool(row >> i & 1) for i, name in enumerate(variables)}
+
+
+def is_tautology(expression):
+    """Returns True if the expression is true under every assignment of truth values to its variables, False if it is
+    not, or None if its truth table cannot be calculated."""
+    table = truth_table(expression)
+    if table is None:
+        return None
+    variables, values = table
+    return values == (1 << (1 << len(variables))) - 1
+
+
+def parse_error(expression):
+    """Returns the error raised when parsing the expression, written as in batch.prove, or None if it parses."""
+    try:
+        syntax.parse(expression)
+    except ValueError as error:
+        return f"{type(error).__name__}: {error}"
+    return None
+
+
+def tautologies(expressions):
+    """Checks each of the expressions as in is_tautology, returning a list of the results. The result for an expression
+    which cannot be parsed is None, as for one whose truth table cannot be calculated. If NumPy is installed, the
+    expressions are grouped by shape, and each large group is evaluated over all its assignments in a single pass, by
+    the program compiled for the shape with each leaf as a separate variable."""
+    expressions = list(expressions)
+    if numpy is None:
+        return [is_tautology(expression) if parse_error(expression) is None else None for expression in expressions]
+
+    results = [None] * len(expressions)
+    groups = {}
+    for position, expression in enumerate(expressions):
+        if parse_error(expression) is not None:
+            continue
+        parsed = evaluator.shape(expression)
+        if parsed is None:
+            continue
+        symbols, names = parsed
+        numbering = {}
+        indexes = [numbering.setdefault(name, len(numbering)) for name in names]
+        if len(numbering) <= MAX_VARIABLES:
+            groups.setdefault(symbols, []).append((position, indexes, len(numbering)))
+
+    for symbols, members in groups.items():
+        if len(members) < NUMPY_GROUP:
+            for position, indexes, n in members:
+                columns, mask = variable_columns(n)
+                results[position] = evaluator.program(symbols, tuple(indexes))(*columns, mask) == mask
+            continue
+
+        program = evaluator.compile_shape(symbols, tuple(range(len(members[0][1]))))
+        n = max(count for _, _, count in members)
+        assignments = numpy.arange(1 << n)
+        # Row i of the columns holds the truth values of the i-th variable, as in variable_column.
+        columns = (assignments >> numpy.arange(n)[:, None]) & 1 == 1
+        rows = max(1, NUMPY_CELLS >> n)
+        for start in range(0, len(members), rows):
+            chunk = members[start:start + rows]
+            indexes = numpy.array([member[1] for member in chunk])
+            table = program(*(columns[indexes[:, leaf]] for leaf in range(indexes.shape[1])), True)
+            for (position, _, _), value in zip(chunk, table.all(axis=1)):
+                results[position] = bool(value)
+
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check whether each expression is a tautology, reading input as for "
+                                                 "batch.py and writing one JSON result per line.")
+    parser.add_argument("input", nargs="?", default="-", help="input file, or '-' for stdin (default)")
+    args = parser.parse_args(argv)
+
+    # Imported here, as batch imports LT, which imports this module.
+    import batch
+
+    source = sys.stdin if args.input == "-" else open(args.input)
+    with source:
+        tasks = list(batch.read_expressions(source))
+    # A line which could not be read has the error raised reading it in place of its expression (see
+    # batch.read_expressions), so it is reported rather than checked.
+    results = iter(tautologies(expression for _, expression in tasks if not isinstance(expression, Exception)))
+    for key, expression in tasks:
+        if isinstance(expression, Exception):
+            record = {"id": key, "expression": None, "tautology": None,
+                      "error": f"{type(expression).__name__}: {expression}"}
+        else:
+            record = {"id": key, "expression": str(expression), "tautology": next(results)}
+            # An expression which cannot be parsed is reported with the error, as by batch.py, rather than ending the
+            # run.
+            error = parse_error(expression)
+            if error is not None:
+                record["error"] = error
+        sys.stdout.write(json.dumps(record) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,26 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import memory
+import proof_cache
+from theorems import axioms
+
+# The axioms as they were before any test ran, restored after each test so no test sees theorems stored by another.
+BASE_AXIOMS = dict(axioms)
+
+
+@pytest.fixture(autouse=True)
+def fresh_memory():
+    """Runs each test against an unbounded theorem memory holding only the axioms, and an empty proof cache."""
+    yield
+    memory.detach()
+    memory.set_capacity(None)
+    axioms.clear()
+    axioms.update(BASE_AXIOMS)
+    memory.clear_indexes()
+    memory.update_indexes()
+    proof_cache.clear()
@@ -0,0 +1,28 @@
+import io
+import json
+
+import batch
+import tautology
+
+LINES = ['p v p :>: p', '{"expression": "p :>: p", "id": "x"', '{"id": 3}', '', '{"expression": ["p", ":>:", "p"]}',
+         '{"expression": 5}']
+
+
+def test_a_line_which_cannot_be_read_is_reported_without_ending_the_batch():
+    results = list(batch.prove_stream(batch.read_expressions(io.StringIO("\n".join(LINES) + "\n")), store=False))
+    assert [record["id"] for record in results] == [1, 2, 3, 5, 6]
+    assert [record["proved"] for record in results] == [True, False, False, True, False]
+    for record in (results[1], results[2], results[4]):
+        assert record["expression"] is None
+        assert record["error"].startswith(f"ValueError: Line {record['id']} could not be read")
+    assert "JSONDecodeError" in results[1]["error"] and "KeyError" in results[2]["error"]
+
+
+def test_tautology_reports_a_line_which_cannot_be_read(tmp_path, capsys):
+    path = tmp_path / "input.txt"
+    path.write_text("\n".join(LINES) + "\n")
+    tautology.main([str(path)])
+    records = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert [(record["id"], record["tautology"]) for record in records] \
+        == [(1, True), (2, None), (3, None), (5, True), (6, None)]
+    assert all("error" in record for record in records if record["tautology"] is None)
@@ -0,0 +1,14 @@
+import benchmark
+
+
+def test_every_memory_size_is_measured_over_the_same_queries(monkeypatch):
+    measured = []
+
+    def measure(target, queries, cache=False):
+        measured.append(list(queries))
+        return [0.001] * len(queries), 0, 0
+
+    monkeypatch.setattr(benchmark, "measure", measure)
+    reports = list(benchmark.run(queries=20, sizes=(0, 30), targets=("substitution",), memory_peaks=False))
+    assert [report["memory"] for report in reports] == [9, 39]
+    assert len(measured) == 2 and measured[0] == measured[1]
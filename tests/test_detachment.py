@@ -0,0 +1,30 @@
+import detachment
+import memory
+from expression import Expression
+
+
+def expand(contracted, contraction_key):
+    """Writes a contracted expression out again, replacing each variable with the unit it replaced."""
+    return Expression([token for symbol in contracted for token in contraction_key.get(symbol, [symbol])])
+
+
+def test_contraction_gives_identical_units_the_same_variable():
+    contracted, contraction_key = detachment.contraction("a > b .v. c :>: a > b .v. c".split())
+    assert contracted == Expression("p .v. q :>: p .v. q".split())
+    assert contraction_key == {"p": Expression("a > b".split()), "q": Expression(["c"])}
+
+
+def test_contraction_handles_more_units_than_letters():
+    units = [f"x{number}" for number in range(14)]
+    expression = " .v. ".join(units + units[:2]).split() + ":>: x13".split()
+    contracted, contraction_key = detachment.contraction(expression)
+    assert len(contraction_key) == 14
+    assert len(set(contracted)) == 14 + 2
+    assert expand(contracted, contraction_key) == Expression(expression)
+
+
+def test_detachment_uses_a_theorem_which_repeats_a_variable():
+    # 'a :>: a' only contracts to an instance of 'p :>: p', the right side of the theorem, if both of its units are
+    # contracted to the same variable. The left side of the theorem is then proved from axiom 1.
+    key = memory.add_theorem("p v p .>. p :>: p .>. p".split())
+    assert detachment.detachment_proof("a :>: a".split()) == (Expression("a :>: a".split()), [key, 1])
@@ -0,0 +1,71 @@
+import itertools
+import random
+from functools import partial
+
+import pytest
+
+import benchmark
+import evaluator
+import tautology
+from expression import Expression
+
+
+def shapes(seed, count=100):
+    """Returns the shape and leaf numbering of random expressions, with the number of distinct variables of each."""
+    rng = random.Random(seed)
+    found = []
+    for _ in range(count):
+        expression = benchmark.random_formula(rng, rng.randint(4, 8), 4, rng.randint(2, 4))
+        symbols, indexes, variables = evaluator.cached_shape(expression)
+        found.append((symbols, indexes, len(variables)))
+    return found
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_compiled_and_interpreted_programs_agree_on_bools(seed):
+    for symbols, indexes, n in shapes(seed):
+        compiled = evaluator.compile_shape(symbols, indexes)
+        for values in itertools.product([False, True], repeat=n):
+            assert compiled(*values, True) == evaluator.interpret(symbols, indexes, *values, True)
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_compiled_and_interpreted_programs_agree_on_packed_ints(seed):
+    for symbols, indexes, n in shapes(seed):
+        columns, mask = tautology.variable_columns(n)
+        assert evaluator.compile_shape(symbols, indexes)(*columns, mask) \
+            == evaluator.interpret(symbols, indexes, *columns, mask)
+
+
+def test_compiled_and_interpreted_programs_agree_on_numpy_arrays():
+    numpy = pytest.importorskip("numpy")
+    for symbols, indexes, n in shapes(0):
+        rows = numpy.arange(1 << n)
+        columns = [(rows >> i) & 1 == 1 for i in range(n)]
+        assert numpy.array_equal(evaluator.compile_shape(symbols, indexes)(*columns, True),
+                                 evaluator.interpret(symbols, indexes, *columns, True))
+
+
+def test_a_shape_is_interpreted_until_it_has_been_used_enough_to_compile(monkeypatch):
+    monkeypatch.setattr(evaluator, "uses", {})
+    symbols, indexes, n = shapes(1, 1)[0]
+    programs = [evaluator.program(symbols, indexes) for _ in range(evaluator.COMPILE_AFTER)]
+    assert all(isinstance(program, partial) for program in programs[:-1])
+    assert programs[-1] is evaluator.compile_shape(symbols, indexes)
+    columns, mask = tautology.variable_columns(n)
+    assert len({program(*columns, mask) for program in programs}) == 1
+
+
+def test_evaluate_reads_implication_and_negation():
+    expression = Expression("-p > q :>: p v q".split())
+    for p, q in itertools.product([False, True], repeat=2):
+        assert evaluator.evaluate(expression, {"p": p, "q": q}) == (not (p or q) or (p or q))
+    assert evaluator.evaluate("p > q".split(), {"p": True, "q": False}) is False
+
+
+def test_a_deep_expression_compiles_and_interprets():
+    expression = Expression(" > ".join(["a", "b"] * 2500).split())
+    symbols, indexes, variables = evaluator.cached_shape(expression)
+    columns, mask = tautology.variable_columns(len(variables))
+    assert evaluator.compile_shape(symbols, indexes)(*columns, mask) \
+        == evaluator.interpret(symbols, indexes, *columns, mask)
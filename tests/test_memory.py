@@ -0,0 +1,74 @@
+import random
+
+import benchmark
+import memory
+import saturate
+import store
+from expression import Expression
+from theorems import axioms
+
+from conftest import BASE_AXIOMS
+
+
+def reload(path, capacity):
+    """Detaches the theorem store and starts again from the axioms, as a new process would, then loads the store."""
+    memory.detach()
+    axioms.clear()
+    axioms.update(BASE_AXIOMS)
+    memory.clear_indexes()
+    memory.attach(path)
+    memory.set_capacity(capacity)
+    memory.update_indexes()
+
+
+def test_the_cold_tier_and_uses_survive_a_restart(tmp_path):
+    path = str(tmp_path / "theorems.db")
+    memory.attach(path)
+    memory.set_capacity(50)
+    rng = random.Random(0)
+    for _ in range(200):
+        memory.add_theorem(benchmark.random_theorem(rng, 4))
+    for key in list(axioms)[-5:]:
+        memory.record_use([key])
+
+    resident = set(axioms)
+    cold = set(memory.cold)
+    uses = dict(memory.uses)
+    last_key = memory.last_key
+    assert cold
+
+    reload(path, 50)
+    assert set(axioms) == resident
+    assert set(memory.cold) == cold
+    assert memory.uses == uses
+    assert memory.last_key == last_key
+
+    # A cold theorem proved again is promoted back under its old key.
+    key = min(cold)
+    text, _ = store.load_theorem(memory.attached_store, key)
+    assert memory.add_theorem(Expression(text.split())) == key
+    assert key in axioms
+
+
+def test_library_theorems_keep_their_keys_and_stay_in_the_cold_tier(tmp_path):
+    library = str(tmp_path / "library.db")
+    path = str(tmp_path / "theorems.db")
+    saturate.saturate(1, 40, None)
+    saturate.write_library(library)
+    derived = {key: axioms[key] for key in axioms if key not in BASE_AXIOMS}
+
+    reload(path, None)
+    assert memory.load_library(library) == len(derived)
+    assert {key - memory.LIBRARY_KEYS: axioms[key] for key in axioms if key not in BASE_AXIOMS} == derived
+    assert memory.last_key == max(BASE_AXIOMS)
+
+    # Library theorems are not in the store, so those evicted are kept in memory, and are not recorded as cold there.
+    memory.set_capacity(20)
+    evicted = [key for key in memory.cold if key >= memory.LIBRARY_KEYS]
+    assert evicted and all(memory.cold[key] is not None for key in evicted)
+    assert memory.add_theorem(memory.cold[evicted[0]][0]) == evicted[0]
+    memory.detach()
+
+    reload(path, 20)
+    assert memory.load_library(library) == len(derived)
+    assert all(key >= memory.LIBRARY_KEYS for key in memory.cold)
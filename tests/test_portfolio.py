@@ -0,0 +1,50 @@
+import pytest
+
+import LT
+import memory
+import portfolio
+import store
+from theorems import axioms
+
+
+@pytest.fixture(autouse=True)
+def fresh_statistics():
+    yield
+    portfolio.clear_statistics()
+
+
+def stored_keys(path):
+    """Returns the keys of the theorems committed to the store at the given path, as another process would see them."""
+    connection = store.open_store(path)
+    try:
+        return {key for key, text, entry in store.load_theorems(connection)}
+    finally:
+        connection.close()
+
+
+def test_a_race_finds_the_same_proof_as_the_executive_routine():
+    expression = "p > -p :>: -p".split()
+    outcome = portfolio.race(expression)
+    assert outcome["method"] == "substitution" and outcome["theorems"] == [1]
+    assert portfolio.statistics()["methods"]["substitution"]["wins"] == 1
+    assert LT.executive_routine(expression, race=True)["proof"] == outcome["proof"]
+
+
+def test_a_race_loads_and_commits_the_store_before_forking(tmp_path):
+    path = str(tmp_path / "theorems.db")
+    memory.attach(path)
+    portfolio.race("p > -p :>: -p".split())
+    # The parent has loaded the store and committed the axioms to it, rather than each child.
+    assert memory.store_loaded and memory.attached_store is not None
+    assert stored_keys(path) == set(axioms)
+
+    key = memory.add_theorem("a .v. b :>: b .v. a".split(), "substitution", [3])
+    portfolio.race("p :>: p".split())
+    assert key in stored_keys(path)
+
+
+def test_a_race_is_refused_while_the_memory_is_sharded(monkeypatch):
+    # The children could not query the shards, so no router need be started to check this.
+    monkeypatch.setattr(memory, "shard_router", object())
+    with pytest.raises(RuntimeError):
+        portfolio.race("p :>: p".split())
@@ -0,0 +1,47 @@
+import LT
+import memory
+import proof_cache
+from expression import Expression
+
+
+def test_a_proof_is_replayed_for_an_expression_differing_only_by_its_variables():
+    first = LT.executive_routine("p > -p :>: -p".split(), store=False)
+    assert first["proof"] is not None and not first["cached"]
+
+    second = LT.executive_routine("a > -a :>: -a".split(), store=False)
+    assert second["cached"]
+    assert second["method"] == first["method"] and second["theorems"] == first["theorems"]
+    # The proof is written in the variables of the expression, not those it was first proved with.
+    assert Expression(second["proof"]) == Expression("a > -a :>: -a".split())
+    assert proof_cache.cache_info()["hits"] == 1
+
+
+def test_a_failure_is_only_cached_until_the_theorem_memory_changes():
+    expression = "a :>: b".split()
+    assert LT.executive_routine(expression, prefilter=False)["proof"] is None
+    assert proof_cache.lookup("c :>: d".split()) == {"method": None, "proof": None, "theorems": None}
+
+    memory.add_theorem("p .v. q :>: q .v. p".split(), "substitution", [3])
+    assert proof_cache.lookup("c :>: d".split()) is None
+    assert proof_cache.cache_info()["currsize"] == 0
+
+
+def test_a_cached_proof_is_not_returned_for_an_expression_which_is_not_a_tautology():
+    # A proof cached by a call without the prefilter is checked by the prefilter of a later call.
+    proof_cache.record("a :>: b > -c > b".split(), {"method": "substitution", "proof": "a :>: b > -c > b".split(),
+                                                     "theorems": [2]})
+    result = LT.executive_routine("x :>: y > -z > y".split())
+    assert not result["cached"] and result["proof"] is None
+    assert result["counterexample"] is not None
+
+
+def test_the_cache_discards_the_least_recently_used_result():
+    proof_cache.resize(2)
+    try:
+        for text in ("a :>: b", "a :>: b v c", "a :>: b > c"):
+            proof_cache.record(text.split(), {"method": None, "proof": None, "theorems": None})
+        assert proof_cache.cache_info()["currsize"] == 2
+        assert proof_cache.lookup("x :>: y".split()) is None
+        assert proof_cache.lookup("x :>: y > z".split()) is not None
+    finally:
+        proof_cache.resize(proof_cache.PROOF_CACHE_SIZE)
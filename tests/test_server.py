@@ -0,0 +1,91 @@
+import asyncio
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import parallel
+import server
+from expression import Expression
+
+
+class Writer:
+    """Collects the responses written by the service, in place of a connection."""
+
+    def __init__(self):
+        self.lines = []
+
+    def write(self, data):
+        self.lines.append(json.loads(data))
+
+    async def drain(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def service_with_blocked_proofs(max_pending=server.MAX_PENDING):
+    """Returns a service whose proofs run in threads and wait for the returned event to be set before finishing, along
+    with the expressions it has started to prove."""
+    service = server.ProverService(processes=1, max_pending=max_pending, store=False)
+    service.pool.shutdown()
+    service.pool = ThreadPoolExecutor(8)
+    release = threading.Event()
+    started = []
+
+    def task(item):
+        started.append(str(item[1]))
+        release.wait(10)
+        return parallel.prove_task(item)
+
+    service.task = task
+    return service, release, started
+
+
+def test_concurrent_requests_for_the_same_expression_share_one_proof():
+    async def scenario():
+        service, release, started = service_with_blocked_proofs()
+        try:
+            proofs = [asyncio.create_task(service.prove(Expression(text.split())))
+                      for text in ("p v p :>: p", "p v p :>: p", "p :>: p", "p v p :>: p")]
+            await asyncio.sleep(0.1)
+            assert sorted(started) == ["p :>: p", "p v p :>: p"]
+            assert service.coalesced == 2
+            release.set()
+            return await asyncio.gather(*proofs)
+        finally:
+            release.set()
+            service.close()
+
+    results = asyncio.run(scenario())
+    assert results[0] == results[1] == results[3]
+    assert results[0]["proved"] and results[0] is not results[1]
+    assert results[2]["proved"]
+
+
+def test_the_server_stops_reading_requests_while_max_pending_proofs_are_waiting():
+    async def scenario():
+        service, release, started = service_with_blocked_proofs(max_pending=2)
+        reader = asyncio.StreamReader()
+        for number, text in enumerate(["p v p :>: p", "p :>: p", "p :>: q v p", "r v r :>: r"]):
+            reader.feed_data((json.dumps({"id": number, "expression": text}) + "\n").encode())
+        reader.feed_data(b"not json\n")
+        reader.feed_eof()
+        writer = Writer()
+        try:
+            handler = asyncio.create_task(service.handle(reader, writer))
+            await asyncio.sleep(0.1)
+            # Only max_pending requests have been read, and the rest are left in the reader.
+            assert len(started) == 2 and not writer.lines
+            assert not reader.at_eof()
+            release.set()
+            await handler
+        finally:
+            release.set()
+            service.close()
+        return writer.lines
+
+    responses = asyncio.run(scenario())
+    assert sorted(response["id"] for response in responses if response["id"] is not None) == [0, 1, 2, 3]
+    assert all(response["proved"] for response in responses if response["id"] is not None)
+    assert [response for response in responses if response["id"] is None][0]["error"]
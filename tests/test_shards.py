@@ -0,0 +1,46 @@
+import random
+
+import benchmark
+import memory
+import shards
+import syntax
+
+
+def lookups(queries):
+    """Returns the results of unifiable and left_unifiable for each query."""
+    trees = [syntax.parse(query) for query in queries]
+    return [(memory.unifiable(tree), memory.left_unifiable(tree)) for tree in trees]
+
+
+def test_sharded_lookups_match_the_local_discrimination_trees():
+    rng = random.Random(0)
+    benchmark.fill_memory(rng, 60, 3)
+    queries = [benchmark.random_formula(rng, rng.randint(3, 5), 3, rng.randint(2, 3)) for _ in range(100)]
+    queries += list(memory.axioms.values())
+    local = lookups(queries)
+    assert any(whole for whole, left in local)
+
+    router = shards.ShardRouter(2)
+    try:
+        memory.attach_shards(router)
+        assert lookups(queries) == local
+        # The symbols are only held by the shards.
+        assert all(entry[5] is None for entry in memory.indexed.values())
+        assert sum(size["whole"]["entries"] for size in router.sizes()) \
+            == sum(len(entry[4]) for entry in memory.indexed.values())
+
+        # Theorems added and removed while sharded are found and forgotten as they would be locally.
+        added = memory.add_theorem("a > b v c :>: a > b v c".split())
+        removed = max(key for key in memory.axioms if key != added)
+        memory.remove_theorem(removed)
+        sharded = lookups(queries)
+
+        memory.detach_shards()
+        assert not any(size["whole"]["entries"] for size in router.sizes())
+    finally:
+        memory.detach_shards()
+        router.close()
+
+    assert lookups(queries) == sharded
+    assert all(entry[5] is not None for entry in memory.indexed.values())
+    assert any(added in [key for key, form in whole] for whole, left in lookups(["x > y v z :>: x > y v z".split()]))
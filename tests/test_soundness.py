@@ -0,0 +1,79 @@
+import random
+
+import pytest
+
+import LT
+import benchmark
+import memory
+import tautology
+from expression import Expression
+from theorems import axioms, expressions
+
+
+def assert_memory_sound():
+    """Every theorem in the theorem memory must be a tautology."""
+    for key, theorem in axioms.items():
+        assert tautology.is_tautology(theorem) is not False, (key, str(Expression(theorem)))
+
+
+@pytest.mark.parametrize("prefilter", [True, False])
+def test_proofs_of_the_example_expressions_are_tautologies(prefilter):
+    # The example expressions are proved twice over, so the second pass can use the theorems stored by the first.
+    for _ in range(2):
+        for key, expression in expressions.items():
+            result = LT.executive_routine(expression, prefilter=prefilter)
+            if result["proof"] is not None:
+                assert tautology.is_tautology(result["proof"]) is not False, key
+    assert_memory_sound()
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_proofs_of_random_expressions_are_tautologies(seed):
+    # Without the prefilter, the methods are given expressions which are not tautologies, as well as ones which are.
+    rng = random.Random(seed)
+    benchmark.fill_memory(rng, 100, 3)
+    for _ in range(150):
+        expression = benchmark.random_formula(rng, rng.randint(3, 6), 3, rng.randint(2, 3))
+        result = LT.executive_routine(expression, prefilter=False)
+        if result["proof"] is not None:
+            assert tautology.is_tautology(result["proof"]) is not False, str(expression)
+    assert_memory_sound()
+
+
+def test_add_theorem_refuses_an_expression_which_is_not_a_tautology():
+    last_key = memory.last_key
+    assert memory.add_theorem("a > b :>: c".split(), "detachment", [7]) is None
+    assert memory.last_key == last_key
+    assert memory.duplicate_report()["refuted"] >= 1
+    assert_memory_sound()
+
+    # Had it been stored, the method of substitution would prove these from it.
+    for key in (5, 7):
+        assert LT.executive_routine(expressions[key], prefilter=False)["method"] != "substitution"
+
+
+def test_substitution_only_uses_the_replaced_form_of_a_theorem_where_it_means_the_same():
+    # 'p > q v p' is '(p > q) v p', so replacing its 'v' would give 'p > -q > p', which is not a theorem.
+    assert memory.add_theorem("a :>: p > q v p".split(), "substitution", [1]) is not None
+    assert LT.executive_routine("a :>: p > -q > p".split(), prefilter=False)["proof"] is None
+    assert memory.substitution_forms(Expression("a :>: p > q v p".split())) == [Expression("a :>: p > q v p".split())]
+    # Where the left operand of each 'v' is a single variable, the replaced form is used.
+    assert memory.substitution_forms(Expression("-p v q .>. r :>: p v r".split()))[1:] \
+        == [Expression("p > q .>. r :>: -p > r".split())]
+
+
+@pytest.mark.parametrize("seed", range(2))
+def test_proofs_from_derived_theorems_are_tautologies(seed):
+    # The memory is filled with theorems derived from the axioms, rather than drawn at random, so the methods are
+    # tested against the theorems they store themselves.
+    rng = random.Random(seed)
+    base = len(axioms)
+    for _ in range(300):
+        LT.executive_routine(benchmark.random_formula(rng, rng.randint(2, 4), 3, 2))
+    assert len(axioms) > base
+    for _ in range(300):
+        expression = benchmark.random_formula(rng, rng.randint(3, 5), 3, rng.randint(2, 3))
+        result = LT.executive_routine(expression, prefilter=False)
+        if result["proof"] is not None:
+            assert tautology.is_tautology(result["proof"]) is not False, str(expression)
+    assert_memory_sound()
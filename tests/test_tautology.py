@@ -0,0 +1,68 @@
+import random
+
+import pytest
+
+import benchmark
+import tautology
+from expression import Expression
+
+TEMPLATES = ["p v q :>: q v p", "p > q :>: -q > -p", "p .v. q v r :>: q .v. p v r", "p > q .>. q > r :>: p > r",
+             "p :>: q"]
+
+
+def rename(template, names):
+    """Renames the variables of a template, keeping their negations."""
+    renamed = []
+    for token in template.split():
+        name = token.lstrip("-")
+        renamed.append(token[:len(token) - len(name)] + names[name] if name in names else token)
+    return Expression(renamed)
+
+
+def expressions(seed):
+    """Returns groups of expressions larger than NUMPY_GROUP, each of one template with its variables renamed at
+    random, so some repeat a variable and some do not, along with random expressions, and expressions which cannot be
+    parsed or evaluated."""
+    rng = random.Random(seed)
+    found = []
+    for template in TEMPLATES:
+        for _ in range(tautology.NUMPY_GROUP + 8):
+            found.append(rename(template, {name: rng.choice("abcde") for name in "pqr"}))
+    found += [benchmark.random_formula(rng, rng.randint(3, 6), 4, rng.randint(2, 3)) for _ in range(50)]
+    found += [Expression("p v :>: q".split()), Expression(":>:".split()), Expression("p q :>: p".split())]
+    rng.shuffle(found)
+    return found
+
+
+def expected(expressions):
+    return [tautology.is_tautology(expression) if tautology.parse_error(expression) is None else None
+            for expression in expressions]
+
+
+@pytest.mark.skipif(tautology.numpy is None, reason="NumPy is not installed")
+@pytest.mark.parametrize("seed", range(3))
+def test_the_numpy_batch_agrees_with_checking_each_expression(seed):
+    batch = expressions(seed)
+    results = tautology.tautologies(batch)
+    assert results == expected(batch)
+    assert True in results and False in results and None in results
+
+
+@pytest.mark.skipif(tautology.numpy is None, reason="NumPy is not installed")
+def test_the_numpy_batch_agrees_when_split_into_chunks(monkeypatch):
+    # With few cells allowed at once, each group is evaluated over several chunks.
+    monkeypatch.setattr(tautology, "NUMPY_CELLS", 1 << 5)
+    batch = expressions(0)
+    assert tautology.tautologies(batch) == expected(batch)
+
+
+def test_tautologies_checks_each_expression_without_numpy(monkeypatch):
+    monkeypatch.setattr(tautology, "numpy", None)
+    batch = expressions(1)
+    assert tautology.tautologies(batch) == expected(batch)
+
+
+def test_counterexample_falsifies_the_expression():
+    assert tautology.counterexample("p v q :>: q v p".split()) is None
+    assert tautology.counterexample("p > q :>: q > p".split()) == {"p": False, "q": True}
+    assert tautology.is_tautology("p q :>: p".split()) is None
@@ -0,0 +1,92 @@
+import syntax
+import unification
+from expression import Expression
+
+
+def parse(text):
+    return syntax.parse(text.split())
+
+
+def test_match_binds_each_variable_to_a_subexpression():
+    binding = unification.match(parse("p :>: q v p"), parse("a :>: c > d v a"))
+    assert binding == {"p": Expression(["a"]), "q": Expression("c > d".split())}
+
+
+def test_match_binds_every_occurrence_of_a_variable_to_the_same_subexpression():
+    assert unification.match(parse("p :>: q v p"), parse("a > b :>: c v a")) is None
+
+
+def test_match_requires_the_same_connectives():
+    assert unification.match(parse("p v q"), parse("a > b")) is None
+    assert unification.match(parse("p .v. q"), parse("a v b")) is None
+
+
+def test_match_binds_a_negated_variable_only_to_a_single_variable():
+    assert unification.match(parse("-p v p"), parse("-q v q")) == {"p": Expression(["q"])}
+    assert unification.match(parse("-p v p"), parse("q v -q")) == {"p": Expression(["-q"])}
+    assert unification.match(parse("-p v p"), parse("q v q")) is None
+    assert unification.match(parse("-p v p"), parse("a > b v a > b")) is None
+
+
+def test_match_extends_a_given_binding_without_changing_it():
+    given = {"p": Expression(["a"])}
+    assert unification.match(parse("p v q"), parse("b v c"), given) is None
+    assert unification.match(parse("p v q"), parse("a v c"), given) == {"p": Expression(["a"]), "q": Expression(["c"])}
+    assert given == {"p": Expression(["a"])}
+
+
+def test_instantiate_applies_the_binding():
+    binding = {"p": Expression(["a"]), "q": Expression("c > d".split())}
+    assert unification.instantiate(parse("p :>: q v p"), binding) == Expression("a :>: c > d v a".split())
+
+
+def test_instantiate_inverts_match():
+    pattern = parse("a .>. b > c :>: b .>. a > c")
+    target = parse("x v y .>. z > -w :>: z .>. x v y > -w")
+    binding = unification.match(pattern, target)
+    assert unification.instantiate(pattern, binding) == target.expression
+
+
+def test_instantiate_negates_a_single_variable():
+    assert unification.instantiate(parse("-p v p"), {"p": Expression(["-q"])}) == Expression("q v -q".split())
+    assert unification.instantiate(parse("-p v p"), {"p": Expression("q v r".split())}) is None
+
+
+def test_instantiate_rejects_an_unbound_variable():
+    assert unification.instantiate(parse("p v q"), {"p": Expression(["a"])}) is None
+
+
+def test_instantiate_rejects_a_binding_which_would_need_brackets():
+    # A unit bound inside a standard connective, or a standard connective bound as its right operand, would group
+    # differently once written out.
+    assert unification.instantiate(parse("p v q"), {"p": Expression("a .v. b".split()), "q": Expression(["c"])}) is None
+    assert unification.instantiate(parse("p v q"), {"p": Expression(["c"]), "q": Expression("a v b".split())}) is None
+    assert unification.instantiate(parse("p v q"), {"p": Expression("a v b".split()), "q": Expression(["c"])}) \
+        == Expression("a v b v c".split())
+
+
+def test_match_and_instantiate_handle_deep_expressions():
+    target = parse(" v ".join(["a"] * 5000) + " :>: a")
+    binding = unification.match(parse("p :>: q"), target)
+    assert binding["q"] == Expression(["a"])
+    assert unification.instantiate(parse("p :>: q"), binding) == target.expression
+
+
+def test_a_discrimination_tree_split_by_prefix_retrieves_the_same_values():
+    theorems = ["p v p :>: p", "p :>: q v p", "p .v. q v r :>: q .v. p v r", "-p v p", "a > b :>: c > a .>. c > b"]
+    queries = ["q v q :>: q", "a > b :>: c > d v a > b", "x v y .v. z v w :>: z v w .v. x v y v w", "-q v q", "r v -r"]
+    whole = {}
+    parts = {}
+    for key, theorem in enumerate(theorems):
+        symbols = unification.pattern_symbols(parse(theorem))
+        unification.insert(whole, symbols, key)
+        unification.insert(parts.setdefault(tuple(symbols[:2]), {}), symbols[2:], key)
+
+    retrieved = 0
+    for query in queries:
+        nodes = unification.target_symbols(parse(query))
+        starts = [(parts[prefix], position) for prefix, position in unification.prefixes(nodes, 2) if prefix in parts]
+        found = sorted(unification.search(starts, nodes))
+        assert found == sorted(unification.retrieve(whole, parse(query)))
+        retrieved += len(found)
+    assert retrieved
@@ -0,0 +1,260 @@
+import syntax
+from expression import Expression
+
+# Symbols used for the variables of a theorem in the discrimination tree. A variable matches any sub-expression, and a
+# negated variable matches any single variable.
+VARIABLE = "*"
+NEGATED_VARIABLE = "-*"
+
+
+# # MATCHING
+
+
+def is_variable(node):
+    """Checks if a node of a theorem's syntax tree is a single variable, which can be bound to a sub-expression."""
+    return node.token is not None
+
+
+def negate(token):
+    """Negates a single variable, cancelling a double negative. I.e., 'p' becomes '-p' and '-p' becomes 'p'."""
+    if token.startswith("-"):
+        return token[1:]
+    return f"-{token}"
+
+
+def bind(variable, value, binding):
+    """Binds a theorem variable to a sub-expression. Returns False if the variable is already bound to a different
+    sub-expression."""
+    bound = binding.get(variable)
+    if bound is None:
+        binding[variable] = value
+        return True
+    return bound == value
+
+
+def match(pattern, target, binding=None):
+    """Matches the syntax tree of a theorem (pattern) against the syntax tree of an expression (target). Each variable
+    of the theorem is bound to a whole sub-expression of the expression, and every occurrence of the variable must be
+    bound to the same sub-expression. A negated variable '-p' can only be matched to a single variable, binding p to
+    its negation. Returns the binding of each theorem variable, or None if the expression is not an instance of the
+    theorem."""
+    binding = dict(binding) if binding else {}
+    stack = [(pattern, target)]
+
+    while stack:
+        p, t = stack.pop()
+
+        if is_variable(p):
+            token = p.token
+            if token.startswith("-"):
+                if not is_variable(t):
+                    return None
+                value = Expression([negate(t.token)])
+                if not bind(token[1:], value, binding):
+                    return None
+            elif not bind(token, t.expression, binding):
+                return None
+
+        elif p.op is None:
+            # A run of tokens with no connective between them can only be matched exactly.
+            # Nodes are hash-consed (see syntax.nodes), so the runs are the same only if the nodes are.
+            if p is not t:
+                return None
+
+        elif p.op != t.op:
+            return None
+
+        else:
+            stack.append((p.right, t.right))
+            stack.append((p.left, t.left))
+
+    return binding
+
+
+def instantiate(pattern, binding):
+    """Applies a binding to the syntax tree of a theorem, returning the resulting Expression. Returns None if a variable
+    is not bound, or if a bound sub-expression cannot be written in its position without brackets (i.e. a unit bound to
+    a variable on either side of a standard connective)."""
+    instance = []
+    # The tree is written in order from a stack rather than by recursion, so a theorem of any depth can be instantiated.
+    # Each connective is pushed between its subtrees, and each subtree with the precedence and side of its parent.
+    stack = [(pattern, 4, "left")]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, str):
+            instance.append(item)
+            continue
+        node, precedence, side = item
+        if node.op is not None:
+            op_precedence = syntax.PRECEDENCE[node.op]
+            stack.append((node.right, op_precedence, "right"))
+            stack.append(node.op)
+            stack.append((node.left, op_precedence, "left"))
+        elif not write_instance(node, binding, instance, precedence, side):
+            return None
+    return Expression(instance)
+
+
+def write_instance(node, binding, instance, precedence, side):
+    """Appends the tokens of a leaf of a theorem's syntax tree to the instance, with a variable replaced by its binding.
+    The precedence and side of the parent connective are used to check that a bound sub-expression still groups the
+    same way once written out. Returns False if it cannot be written."""
+    if is_variable(node):
+        token = node.token
+        if token.startswith("-"):
+            value = binding.get(token[1:])
+            if value is None or len(value) != 1:
+                return False
+            instance.append(negate(value[0]))
+            return True
+
+        value = binding.get(token)
+        if value is None:
+            return False
+
+        op = syntax.parse(value).op
+        if op is not None:
+            bound_precedence = syntax.PRECEDENCE[op]
+            # The standard and unit connectives group to the left, so a sub-expression of the same precedence can only
+            # be written as the left operand.
+            if bound_precedence > precedence or (bound_precedence == precedence and side != "left") \
+                    or bound_precedence == 3:
+                return False
+        instance.extend(value)
+        return True
+
+    instance.extend(node.expression)
+    return True
+
+
+# # DISCRIMINATION TREE
+# The discrimination tree is a trie over the symbols of each theorem's syntax tree, read in preorder. Each connective
+# is its own symbol and each variable is replaced by a wildcard, so a query walks the trie with the preorder symbols of
+# the expression and only reaches theorems which the expression could be an instance of. The values stored at the end
+# of each path are kept under the key None.
+
+
+def pattern_symbols(tree):
+    """Returns the preorder symbols of a theorem's syntax tree, with variables replaced by wildcards."""
+    symbols = []
+    stack = [tree]
+    while stack:
+        node = stack.pop()
+        if is_variable(node):
+            token = node.token
+            symbols.append(NEGATED_VARIABLE if token.startswith("-") else VARIABLE)
+        elif node.op is None:
+            symbols.append(str(node.expression))
+        else:
+            symbols.append(node.op)
+            stack.append(node.right)
+            stack.append(node.left)
+    return symbols
+
+
+def insert(trie, symbols, value):
+    """Inserts a value into the discrimination tree under the given symbols."""
+    node = trie
+    for symbol in symbols:
+        node = node.setdefault(symbol, {})
+    node.setdefault(None, []).append(value)
+
+
+def remove(trie, symbols, value):
+    """Removes a value from the discrimination tree, pruning any branches left empty."""
+    path = [trie]
+    for symbol in symbols:
+        path.append(path[-1][symbol])
+
+    path[-1][None].remove(value)
+    if not path[-1][None]:
+        del path[-1][None]
+
+    for symbol, parent, child in zip(reversed(symbols), reversed(path[:-1]), reversed(path[1:])):
+        if child:
+            break
+        del parent[symbol]
+
+
+def target_symbols(tree):
+    """Returns the preorder symbols of an expression's syntax tree for a query of the discrimination tree, each with
+    the position in the preorder list which follows its subtree. This allows a wildcard to skip the whole subtree it is
+    matched to. The symbol of a connective node is its connective, and of any other leaf its tokens, as in
+    pattern_symbols, while a single variable has the symbol None, as it can only be matched by a wildcard. The symbols
+    are plain strings, so they can be sent to another process (see shards.py)."""
+    nodes = []
+    # The tree is read from a stack rather than by recursion. A node's entry is filled in once its subtree has been
+    # read, which is marked by pushing its position after its subtrees.
+    stack = [tree]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, int):
+            nodes[node] = (nodes[node], len(nodes))
+            continue
+        stack.append(len(nodes))
+        if node.op is not None:
+            nodes.append(node.op)
+            stack.append(node.right)
+            stack.append(node.left)
+        elif is_variable(node):
+            nodes.append(None)
+        else:
+            nodes.append(str(node.expression))
+    return nodes
+
+
+def search(starts, nodes):
+    """Returns the values stored in the discrimination tree for every theorem that the expression with the given
+    target symbols could be an instance of, starting from each (branch of the trie, position in the target symbols)."""
+    found = []
+    stack = list(starts)
+
+    while stack:
+        branch, position = stack.pop()
+        if position == len(nodes):
+            found.extend(branch.get(None, []))
+            continue
+
+        symbol, following = nodes[position]
+
+        # A variable can be matched to the whole subtree at this position.
+        if VARIABLE in branch:
+            stack.append((branch[VARIABLE], following))
+
+        # A negated variable can only be matched to a single variable, and any other symbol only to itself.
+        if symbol is None:
+            if NEGATED_VARIABLE in branch:
+                stack.append((branch[NEGATED_VARIABLE], following))
+        elif symbol in branch:
+            stack.append((branch[symbol], position + 1))
+
+    return found
+
+
+def retrieve(trie, tree):
+    """Returns the values stored in the discrimination tree for every theorem that the expression could be an instance
+    of."""
+    return search([(trie, 0)], target_symbols(tree))
+
+
+def prefixes(nodes, depth):
+    """Returns each sequence of the first `depth` pattern symbols which a theorem the expression with the given target
+    symbols could be an instance of might begin with, along with the position in the target symbols which follows it.
+    The whole pattern is used for a theorem with fewer symbols. As each symbol of the target is matched by a wildcard or
+    by one other symbol, there are at most 2**depth of them. Used to split a discrimination tree between shards by
+    prefix (see shards.py)."""
+    found = []
+    stack = [((), 0)]
+    while stack:
+        prefix, position = stack.pop()
+        if len(prefix) == depth or position == len(nodes):
+            found.append((prefix, position))
+            continue
+
+        symbol, following = nodes[position]
+        stack.append((prefix + (VARIABLE,), following))
+        if symbol is None:
+            stack.append((prefix + (NEGATED_VARIABLE,), following))
+        else:
+            stack.append((prefix + (symbol,), position + 1))
+    return found